@@ -10,21 +10,60 @@ class AudioLoader:
         # Specify the format of the audio files
         self.file_types = [('Audio Files', '*.wav *.mp3 *.m4a')]
 
-    # Added a parameter to specify the number of seconds to load in the load_audio method
-    def load_audio(self, seconds=5):
+    def select_file(self):
+        """
+        Display a file selection dialog and return the selected path (None if cancelled).
+        """
         root = tk.Tk()  # Create the root window for Tkinter
         root.withdraw()  # Hide the root window
         file_path = filedialog.askopenfilename(filetypes=self.file_types)  # Display file selection dialog and get the file path
         if file_path:
             print(f"User selected {file_path}")  # Display the file path selected by the user
-            # First, open the file and get the sampling rate
-            data, fs = sf.read(file_path, dtype='float32')
+            return file_path
+        print("User selected Cancel")  # If the user cancels
+        return None
+
+    # Added a parameter to specify the number of seconds to load in the load_audio method
+    def load_audio(self, seconds=5):
+        file_path = self.select_file()  # Display file selection dialog and get the file path
+        if file_path:
+            # First, get the sampling rate from the file header
+            fs = sf.info(file_path).samplerate
             # Re-read the data for the length of time specified by the user
             data, fs = sf.read(file_path, start=0, stop=seconds*fs, dtype='float32')
             return data, fs
         else:
-            print("User selected Cancel")  # If the user cancels
             return None, None  # Return None
+
+    def stream_audio(self, file_path, block_size=65536, seconds=None):
+        """
+        Yield the audio file in blocks of block_size samples without loading it all into memory.
+        If seconds is given, stop after that many seconds of audio.
+        """
+        fs = sf.info(file_path).samplerate  # Read the sampling rate from the file header
+        frames = -1 if seconds is None else int(seconds * fs)
+        for block in sf.blocks(file_path, blocksize=block_size, frames=frames, dtype='float32'):
+            yield block
+
+    def stream_audio_pairs(self, input_file, output_file, accumulate, block_size=65536, seconds=None, progress_callback=None):
+        """
+        Stream an input and an output audio file side by side and pass each pair of blocks to
+        accumulate(input_block, output_block), both trimmed to a common length in case the files differ in size.
+        progress_callback (optional) is called as progress_callback(block_index, samples_processed) after every block.
+        Returns the number of samples processed.
+        """
+        samples_processed = 0
+        input_blocks = self.stream_audio(input_file, block_size, seconds)
+        output_blocks = self.stream_audio(output_file, block_size, seconds)
+        for block_index, (input_block, output_block) in enumerate(zip(input_blocks, output_blocks)):
+            length = min(len(input_block), len(output_block))
+            accumulate(input_block[:length], output_block[:length])
+            samples_processed += length
+            if progress_callback is not None:
+                progress_callback(block_index, samples_processed)
+
+        print(f"Accumulated {samples_processed} samples.")
+        return samples_processed
         
     def save_audio(self, time_series_data, sample_rate, file_name):
         # Normalize the time series data to ensure the range is between -1 and 1
@@ -0,0 +1,66 @@
+import numpy as np
+
+class BlockToeplitzSolver:
+    def __init__(self, blocks):
+        """
+        Prepare a block Levinson solver for the symmetric block-Toeplitz matrix T with
+        T[i, j] = blocks[j - i] for j >= i and T[i, j] = blocks[i - j].T otherwise
+        blocks: Array of shape (n, d, d) holding the first block row of T
+        """
+        self.blocks = np.asarray(blocks, dtype=np.float64)
+        self.backward = self.levinson_recursion()
+
+    def levinson_recursion(self):
+        """
+        Run the block Levinson recursion and keep the backward vectors b^k (k = 1 ... n),
+        which satisfy T_k b^k = [0, ..., 0, I]; any right-hand side is then solved in O(n^2 d^2)
+        """
+        R = self.blocks
+        n, d, _ = R.shape
+        identity = np.eye(d)
+        forward = np.linalg.inv(R[0])[np.newaxis]
+        if not np.all(np.isfinite(forward)):
+            raise np.linalg.LinAlgError("Non-finite Levinson pivot at step 0")
+        backward = [forward.copy()]
+
+        for k in range(1, n):
+            b = backward[-1]
+            # Residual blocks left by padding the forward vector below and the backward vector above
+            eps_f = np.einsum('iba,ibc->ac', R[k:0:-1], forward)
+            eps_b = np.einsum('iab,ibc->ac', R[1:k + 1], b)
+
+            X = np.linalg.inv(identity - eps_b @ eps_f)
+            Y = np.linalg.inv(identity - eps_f @ eps_b)
+            forward_padded = np.concatenate((forward, np.zeros((1, d, d))))
+            backward_padded = np.concatenate((np.zeros((1, d, d)), b))
+            forward = forward_padded @ X - backward_padded @ (eps_f @ X)
+            backward.append(backward_padded @ Y - forward_padded @ (eps_b @ Y))
+            if not (np.all(np.isfinite(forward)) and np.all(np.isfinite(backward[-1]))):
+                raise np.linalg.LinAlgError(f"Non-finite Levinson pivot at step {k}")
+
+        return backward
+
+    def solve(self, rhs):
+        """
+        Solve T x = rhs for a right-hand side of shape (n, d)
+        """
+        R = self.blocks
+        n, d, _ = R.shape
+        x = np.zeros((n, d))
+        x[0] = self.backward[0][0] @ rhs[0]
+        for k in range(1, n):
+            eps_x = np.einsum('iba,ib->a', R[k:0:-1], x[:k])
+            x[:k + 1] += self.backward[k] @ (rhs[k] - eps_x)
+        return x
+
+    def dense_matrix(self):
+        """
+        Return T as a dense (n*d x n*d) matrix
+        """
+        R = self.blocks
+        n, d, _ = R.shape
+        T = np.empty((n * d, n * d))
+        for i in range(n):
+            for j in range(n):
+                T[i*d:(i+1)*d, j*d:(j+1)*d] = R[j - i] if j >= i else R[i - j].T
+        return T
@@ -0,0 +1,29 @@
+import numpy as np
+
+class ClosedLoopAnalysis:
+    def __init__(self, gain, eigenvalues, control_period):
+        """
+        Result of analyzing the closed loop for one gain, shared by every consumer of that gain
+        (eigenvalue plot, stability warning, ...)
+        eigenvalues: Continuous-time closed-loop eigenvalues (log(eig(A_cl)) / dt)
+        control_period: Sampling period dt in seconds
+        """
+        self.gain = gain
+        self.eigenvalues = np.asarray(eigenvalues)
+        self.eigenvalues.flags.writeable = False  # The analysis may be shared through the cache
+        real_parts = np.real(self.eigenvalues)
+
+        # The mode with the largest real part decays slowest (or grows fastest)
+        dominant_index = np.argmax(real_parts)
+        self.dominant_mode = self.eigenvalues[dominant_index]
+        self.dominant_frequency = abs(np.imag(self.dominant_mode)) / (2 * np.pi)  # Hz
+
+        # |exp(lambda * dt)| of the dominant mode is the spectral radius of the discrete A_cl
+        self.spectral_radius = float(np.exp(real_parts[dominant_index] * control_period))
+        self.stable = bool(real_parts[dominant_index] < 0)
+
+    def stable_mask(self):
+        """
+        Return a boolean array marking the eigenvalues with negative real part
+        """
+        return np.real(self.eigenvalues) < 0
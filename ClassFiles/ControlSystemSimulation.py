@@ -1,20 +1,29 @@
 import numpy as np
-import scipy.linalg
 import control as ctrl
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import os
 import csv
+from ClassFiles.AudioLoader import AudioLoader
 from ClassFiles.SRIMAlgorithm import SRIMAlgorithm
 from ClassFiles.PredictiveErrorMethod import PredictiveErrorMethod
+from ClassFiles.PrecisionPolicy import PrecisionPolicy
+from ClassFiles.StateSpaceSimulator import StateSpaceSimulator
+from ClassFiles.EigenDecompositionCache import EigenDecompositionCache
 
 class ControlSystemSimulation:
-    def __init__(self, n, t_end=10, num_points=1000):
+    def __init__(self, n, t_end=10, num_points=1000, precision=None, simulation_backend='block'):
         self.n = n
         self.m = 1
         self.r = 1
         self.t = np.linspace(0, t_end, num_points)
         self.Ts = self.t[1] - self.t[0]
+        # Precision of signal-length arrays; small factorizations always run in float64
+        self.precision = precision if precision is not None else PrecisionPolicy()
+        # Backend of StateSpaceSimulator used by simulate_discrete_state_space
+        self.simulation_backend = simulation_backend
+        # Eigendecompositions and matrix logarithms shared with the other classes
+        self.eigen_cache = EigenDecompositionCache.shared()
         print(f"Initialized ControlSystemSimulation class with t from 0 to {t_end} seconds and {num_points} points.")
 
     def generate_pwm_signal(self, frequency, duty_cycle, duration=5):
@@ -82,25 +91,9 @@ class ControlSystemSimulation:
         Returns:
         np.ndarray: Output time series signal.
         """
-        # Number of time steps and input length
-        num_steps = len(input_signal)
-        
-        # Initialize state vector (assuming zero initial state)
-        state_vector = np.zeros(A.shape[0])
-        
-        # Initialize output signal array
-        output_signal = np.zeros(num_steps)
-        
-        # Iterate through each time step to compute the state and output
-        for t in range(num_steps):
-            # Ensure input_signal[t] is at least 1D (in case it's a scalar)
-            current_input = np.atleast_1d(input_signal[t])
-            
-            # Compute the output at the current time step
-            output_signal[t] = C @ state_vector + D @ current_input
-            
-            # Update the state vector for the next time step
-            state_vector = A @ state_vector + B @ current_input
+        # Simulate from a zero initial state with the shared simulation engine
+        simulator = StateSpaceSimulator(A, B, C, D, backend=self.simulation_backend)
+        output_signal = simulator.simulate_output(input_signal, dtype=self.precision.data_dtype)
         
         return output_signal
 
@@ -194,7 +187,8 @@ class ControlSystemSimulation:
                                     l=num_samples, 
                                     Y=output_signals, 
                                     U=input_signals, 
-                                    mode=0)
+                                    mode=0,
+                                    precision=self.precision)
 
         # Run the SRIM algorithm to identify system matrices
         A_matrix, B_matrix, C_matrix, D_matrix = srim_algorithm.run()
@@ -204,13 +198,147 @@ class ControlSystemSimulation:
 
         return identified_system
 
-    def identify_system_PEM(self, input_signals, output_signals):
+    def identify_system_SRIM_sweep(self, input_signals, output_signals, orders, fit_samples=4410):
+        """
+        Identify SRIM models for a range of system orders from one decomposition and score each one.
+        
+        Parameters:
+        input_signals (array): The input signals to the system.
+        output_signals (array): The output signals from the system.
+        orders (iterable): Candidate system orders (e.g. range(10, 201)).
+        fit_samples (int): Number of leading samples used to compute the simulation fit.
+
+        Returns:
+        list: One dict per order with keys 'order', 'system', 'residual' and 'fit'.
+              'fit' is the normalized output fit in percent (100 is a perfect match).
+        """
+        print("Identifying systems for multiple orders using SRIM Algorithm ...")
+        orders = sorted(orders)
+
+        # p is selected for the largest order so every candidate shares one decomposition
+        srim_algorithm = SRIMAlgorithm(n=orders[-1], 
+                                    m=self.m, 
+                                    r=self.r, 
+                                    l=len(input_signals), 
+                                    Y=output_signals, 
+                                    U=input_signals, 
+                                    mode=0,
+                                    precision=self.precision)
+        models = srim_algorithm.run_order_sweep(orders)
+
+        # Fit is measured against the recorded output over the leading segment
+        input_segment = input_signals[:fit_samples]
+        output_segment = np.asarray(output_signals[:fit_samples], dtype=np.float64)
+        output_deviation = np.linalg.norm(output_segment - np.mean(output_segment))
+
+        results = []
+        for order in orders:
+            A_matrix, B_matrix, C_matrix, D_matrix, residual = models[order]
+            simulated = self.simulate_discrete_state_space(A_matrix, B_matrix, C_matrix, D_matrix, input_segment)
+            fit = 100 * (1 - np.linalg.norm(output_segment - simulated) / output_deviation)
+            results.append({
+                'order': order,
+                'system': ctrl.ss(A_matrix, B_matrix, C_matrix, D_matrix, self.Ts),
+                'residual': residual,
+                'fit': fit
+            })
+            print(f"Order {order}: residual {residual:.3e}, fit {fit:.2f}%")
+
+        best = max(results, key=lambda result: result['fit'])
+        print(f"Best fit at order {best['order']} ({best['fit']:.2f}%).")
+        return results
+
+    def identify_system_SRIM_streaming(self, input_file, output_file, block_size=65536, seconds=None, progress_callback=None):
+        """
+        Identify the system using the SRIM Algorithm while reading the input/output audio files block by block.
+        Memory use is bounded by block_size regardless of the recording length.
+
+        Parameters:
+        input_file (str): Path to the input audio file.
+        output_file (str): Path to the output audio file.
+        block_size (int): Number of samples read per block.
+        seconds (float): Optional duration to read from each file (None reads the whole file).
+        progress_callback (callable): Optional function called as progress_callback(block_index, samples_processed).
+
+        Returns:
+        identified_system: The identified discrete-time system model.
+        """
+        print("Identifying system using SRIM Algorithm (streaming) ...")
+        audio_loader = AudioLoader()
+
+        # The data length is unknown up front; SRIM only needs it for the in-memory path
+        srim_algorithm = SRIMAlgorithm(n=self.n, 
+                                    m=self.m, 
+                                    r=self.r, 
+                                    l=0, 
+                                    Y=None, 
+                                    U=None, 
+                                    mode=0,
+                                    precision=self.precision)
+
+        # SRIM takes the output block first
+        srim_algorithm.l = audio_loader.stream_audio_pairs(
+            input_file, output_file, lambda input_block, output_block: srim_algorithm.accumulate_block(output_block, input_block),
+            block_size, seconds, progress_callback)
+
+        # Run the SVD and A/B/C/D extraction once on the accumulated correlations
+        A_matrix, B_matrix, C_matrix, D_matrix = srim_algorithm.finalize_accumulation()
+
+        # Construct the identified system as a discrete-time system model
+        identified_system = self.build_digital_system(A_matrix, B_matrix, C_matrix, D_matrix)
+
+        return identified_system
+
+    def validate_precision(self, input_signals, output_signals, data_dtype=np.float32, method='SRIM', tolerance=1e-3):
+        """
+        Compare identification in reduced data precision against the full-float64 reference.
+        
+        Parameters:
+        input_signals (array): The input signals to the system.
+        output_signals (array): The output signals from the system.
+        data_dtype: Data precision to validate (default float32).
+        method (str): 'SRIM' or 'PEM'.
+        tolerance (float): Maximum accepted relative error of the impulse response (Markov parameters).
+
+        Returns:
+        dict: Report from PrecisionPolicy.compare_models with an added 'passed' flag.
+        """
+        print(f"Validating {np.dtype(data_dtype).name} identification against float64 ({method}) ...")
+        models = []
+        for precision in (PrecisionPolicy(np.float64), PrecisionPolicy(data_dtype)):
+            if method == 'SRIM':
+                algorithm = SRIMAlgorithm(n=self.n, 
+                                        m=self.m, 
+                                        r=self.r, 
+                                        l=len(input_signals), 
+                                        Y=output_signals, 
+                                        U=input_signals, 
+                                        mode=0,
+                                        precision=precision)
+                models.append(algorithm.run())
+            else:
+                algorithm = PredictiveErrorMethod(input_data=input_signals, 
+                                                output_data=output_signals, 
+                                                system_order=self.n,
+                                                precision=precision)
+                models.append(algorithm.identify_state_space())
+
+        report = PrecisionPolicy.compare_models(models[0], models[1])
+        report['passed'] = report['markov_relative_error'] <= tolerance
+        for key, value in report.items():
+            print(f"{key}: {value}")
+        if not report['passed']:
+            print(f"Warning: {np.dtype(data_dtype).name} identification exceeds the tolerance; use float64.")
+        return report
+
+    def identify_system_PEM(self, input_signals, output_signals, solver='cholesky'):
         """
         Identify the system using the Predictive Error Method (PEM).
         
         Parameters:
         input_signals (array): The input signals to the system.
         output_signals (array): The output signals from the system.
+        solver (str): Least-squares solver of PEM: 'cholesky', 'lstsq' or 'toeplitz' (see PredictiveErrorMethod.estimate_ab_coefficients).
 
         Returns:
         identified_system: The identified continuous-time system model.
@@ -220,10 +348,11 @@ class ControlSystemSimulation:
         # Instantiate the PredictiveErrorMethod class for system identification
         pem_algorithm = PredictiveErrorMethod(input_data=input_signals, 
                                             output_data=output_signals, 
-                                            system_order=self.n)
+                                            system_order=self.n,
+                                            precision=self.precision)
 
         # Estimate system matrices using PEM
-        A_matrix, B_matrix, C_matrix, D_matrix = pem_algorithm.identify_state_space()
+        A_matrix, B_matrix, C_matrix, D_matrix = pem_algorithm.identify_state_space(solver)
 
         # Construct the identified system as a continuous-time system model
         identified_system = self.build_digital_system(A_matrix, B_matrix, C_matrix, D_matrix)
@@ -231,6 +360,40 @@ class ControlSystemSimulation:
         return identified_system
     
 
+    def identify_system_PEM_streaming(self, input_file, output_file, block_size=65536, seconds=None, progress_callback=None):
+        """
+        Identify the system using the Predictive Error Method while reading the input/output audio files block by block.
+        Only Omega^T Omega and Omega^T y are kept, so memory does not grow with the recording length.
+
+        Parameters:
+        input_file (str): Path to the input audio file.
+        output_file (str): Path to the output audio file.
+        block_size (int): Number of samples read per block.
+        seconds (float): Optional duration to read from each file (None reads the whole file).
+        progress_callback (callable): Optional function called as progress_callback(block_index, samples_processed).
+
+        Returns:
+        identified_system: The identified discrete-time system model.
+        """
+        print("Identifying system using Predictive Error Method (streaming) ...")
+        audio_loader = AudioLoader()
+
+        pem_algorithm = PredictiveErrorMethod(input_data=None, 
+                                            output_data=None, 
+                                            system_order=self.n,
+                                            precision=self.precision)
+
+        audio_loader.stream_audio_pairs(input_file, output_file, pem_algorithm.accumulate_block,
+                                        block_size, seconds, progress_callback)
+
+        # Solve the accumulated normal equations once
+        A_matrix, B_matrix, C_matrix, D_matrix = pem_algorithm.finalize_accumulation()
+
+        # Construct the identified system as a discrete-time system model
+        identified_system = self.build_digital_system(A_matrix, B_matrix, C_matrix, D_matrix)
+
+        return identified_system
+
     def plot_step_response(self, original_system, identified_system):
         print("Plotting step response for original and identified systems ...")
         T, yout_original = ctrl.step_response(original_system, T=self.t, input=0)
@@ -250,10 +413,8 @@ class ControlSystemSimulation:
 
     def plot_eigenvalues(self, original_system, identified_system):
         print("Plotting eigenvalues for original and identified systems ...")
-        A_original = scipy.linalg.logm(original_system.A) / self.Ts
-        A_identified = scipy.linalg.logm(identified_system.A) / self.Ts
-        eig_original = np.linalg.eigvals(A_original)
-        eig_identified = np.linalg.eigvals(A_identified)
+        eig_original = self.eigen_cache.continuous_eigenvalues(original_system.A, self.Ts)
+        eig_identified = self.eigen_cache.continuous_eigenvalues(identified_system.A, self.Ts)
 
         plt.figure()
         plt.scatter(np.real(eig_original), np.imag(eig_original), label='Original System', marker='o')
@@ -351,10 +512,8 @@ class ControlSystemSimulation:
         print("Plotting eigenvalues for Plant and Ideal systems...")
 
         # Calculate discrete-time A matrices and eigenvalues for both systems
-        A_Plant = scipy.linalg.logm(Plant_system.A) / self.Ts
-        A_Ideal = scipy.linalg.logm(Ideal_system.A) / self.Ts
-        eig_Plant = np.linalg.eigvals(A_Plant)
-        eig_Ideal = np.linalg.eigvals(A_Ideal)
+        eig_Plant = self.eigen_cache.continuous_eigenvalues(Plant_system.A, self.Ts)
+        eig_Ideal = self.eigen_cache.continuous_eigenvalues(Ideal_system.A, self.Ts)
 
         # Plot the eigenvalues
         plt.figure()
@@ -446,10 +605,8 @@ class ControlSystemSimulation:
 
     def plot_eigenvalues_SRIMvsPEM(self, SRIM_system, PEM_system):
         print("Plotting eigenvalues for SRIM and PEM ...")
-        A_SRIM = scipy.linalg.logm(SRIM_system.A) / self.Ts
-        A_PEM = scipy.linalg.logm(PEM_system.A) / self.Ts
-        eig_SRIM = np.linalg.eigvals(A_SRIM)
-        eig_PEM = np.linalg.eigvals(A_PEM)
+        eig_SRIM = self.eigen_cache.continuous_eigenvalues(SRIM_system.A, self.Ts)
+        eig_PEM = self.eigen_cache.continuous_eigenvalues(PEM_system.A, self.Ts)
 
         plt.figure()
         plt.scatter(np.real(eig_SRIM), np.imag(eig_SRIM), label='Identified System using SRIM', marker='o')
@@ -543,8 +700,7 @@ class ControlSystemSimulation:
 
     def plot_eigenvalues_SRIM(self, SRIM_system):
         print("Plotting eigenvalues for SRIM ...")
-        A_SRIM = scipy.linalg.logm(SRIM_system.A) / self.Ts
-        eig_SRIM = np.linalg.eigvals(A_SRIM)
+        eig_SRIM = self.eigen_cache.continuous_eigenvalues(SRIM_system.A, self.Ts)
 
         plt.figure()
         plt.scatter(np.real(eig_SRIM), np.imag(eig_SRIM), label='Identified System using SRIM', marker='x')
@@ -620,7 +776,7 @@ class ControlSystemSimulation:
         """
         Compute the matrix logarithm of A and scale by the sampling time Ts.
         """
-        A_log = scipy.linalg.logm(A) / self.Ts
+        A_log = self.eigen_cache.logarithm(A) / self.Ts
         return A_log
 
     # Function to compute eigenvalues of a matrix
@@ -628,7 +784,7 @@ class ControlSystemSimulation:
         """
         Compute the eigenvalues of matrix A.
         """
-        eigvals = np.linalg.eigvals(A)
+        eigvals = self.eigen_cache.eigenvalues(A)
         return eigvals
 
     # Function to compute natural frequencies (Hz) from the imaginary parts of the eigenvalues
@@ -683,17 +839,13 @@ class ControlSystemSimulation:
     def process_matrix_and_save(self, A, filename="eigenvalues_frequencies.csv"):
         """
         Full process: 
-        1. Compute matrix logarithm scaled by Ts
-        2. Compute eigenvalues
+        1-2. Compute the eigenvalues of the matrix logarithm scaled by Ts (as log(eig(A)) / Ts)
         3. Sort eigenvalues by real part
         4. Compute natural frequencies from the eigenvalues' imaginary parts
         5. Save the real parts and natural frequencies to a CSV file
         """
-        # Step 1: Compute scaled logarithm of A
-        A_log = self.compute_scaled_logarithm(A)
-        
-        # Step 2: Compute eigenvalues
-        eigvals = self.compute_eigenvalues(A_log)
+        # Step 1-2: Compute the continuous-time eigenvalues without forming logm(A)
+        eigvals = self.eigen_cache.continuous_eigenvalues(A, self.Ts)
         
         # Step 3: Sort eigenvalues by real part
         eigvals_sorted = self.sort_eigenvalues_by_real_part(eigvals)
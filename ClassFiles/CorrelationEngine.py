@@ -0,0 +1,64 @@
+import numpy as np
+import scipy.fft
+
+class CorrelationEngine:
+    def __init__(self, window, dtype=np.float64):
+        """
+        Initialize the engine for sliding windows of the given length
+        window: Number of samples per window (the SRIM parameter p)
+        dtype: Precision of the signals and FFTs; the (p x p) sums are always float64
+        """
+        self.window = window
+        self.dtype = dtype
+
+    def cross_correlation(self, x, z, max_lag):
+        """
+        Calculate c(d) = sum_t x[t] z[t+d] for d = -max_lag ... max_lag using the FFT
+        The returned array is indexed by d + max_lag
+        """
+        length = len(x)
+        nfft = scipy.fft.next_fast_len(length + max_lag, real=True)
+        X = scipy.fft.rfft(x, nfft)
+        Z = scipy.fft.rfft(z, nfft)
+        circular = scipy.fft.irfft(np.conj(X) * Z, nfft)
+
+        # Negative lags wrap around to the end of the circular correlation
+        return np.concatenate((circular[nfft - max_lag:], circular[:max_lag + 1]))
+
+    def lagged_correlation(self, x, z):
+        """
+        Calculate M[a, b] = sum_i x[i+a] z[i+b] over every full window of two signals
+        This equals Xp @ Zp.T for the Hankel matrices of x and z, without building them
+        """
+        x = np.asarray(x, dtype=self.dtype)
+        z = np.asarray(z, dtype=self.dtype)
+        p = self.window
+        N = len(x) - p + 1
+        c = self.cross_correlation(x, z, p - 1)
+
+        # First row (a = 0, lag b) and first column (b = 0, lag -a) from the full-length lags,
+        # minus the products that fall beyond the last window
+        M = np.empty((p, p))
+        for d in range(p):
+            M[0, d] = c[p - 1 + d] - np.dot(x[N:len(x) - d], z[N + d:])
+            M[d, 0] = c[p - 1 - d] - np.dot(x[N + d:], z[N:len(z) - d])
+
+        # Walk down the diagonals: each step drops the first product and adds the next one
+        for a in range(1, p):
+            M[a, 1:] = M[a - 1, :-1] - x[a - 1] * z[:p - 1] + x[a - 1 + N] * z[N:N + p - 1]
+
+        return M
+
+    def block_correlation(self, X, Z):
+        """
+        Calculate Xp @ Zp.T for multi-channel signals (length x channels) in the row
+        layout used by SRIMAlgorithm.hankel_view, where channel j occupies rows j*p ... (j+1)*p-1
+        """
+        X = np.asarray(X, dtype=self.dtype).reshape(len(X), -1)
+        Z = np.asarray(Z, dtype=self.dtype).reshape(len(Z), -1)
+        p = self.window
+        M = np.empty((p * X.shape[1], p * Z.shape[1]))
+        for j in range(X.shape[1]):
+            for k in range(Z.shape[1]):
+                M[j*p:(j+1)*p, k*p:(k+1)*p] = self.lagged_correlation(X[:, j], Z[:, k])
+        return M
@@ -0,0 +1,114 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import scipy.linalg
+
+class EigenDecompositionCache:
+    shared_instance = None
+
+    def __init__(self, max_entries=16):
+        """
+        Cache eigendecompositions and matrix logarithms of state matrices
+        Entries are keyed by the content of the matrix (shape, dtype and a hash of its bytes), so the
+        same A reaching different plots, conversions and analyses is decomposed only once
+        max_entries: Number of matrices kept; the least recently used entry is evicted first
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()  # Entries may be looked up from a worker thread
+
+    @classmethod
+    def shared(cls):
+        """
+        Return the cache shared by all classes of the project (created on first use)
+        """
+        if cls.shared_instance is None:
+            cls.shared_instance = cls()
+        return cls.shared_instance
+
+    def entry(self, A):
+        """
+        Return the (possibly new) cache entry of matrix A and mark it as most recently used
+        """
+        A = np.ascontiguousarray(A, dtype=np.complex128 if np.iscomplexobj(A) else np.float64)
+        key = (A.shape, A.dtype.char, hashlib.blake2b(A.tobytes(), digest_size=16).hexdigest())
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                # Keep a private read-only copy: ascontiguousarray may return the caller's own array,
+                # which the caller could modify before the remaining results are computed from it
+                A = A.copy()
+                A.flags.writeable = False
+                entry = {'matrix': A}
+                self.entries[key] = entry
+                if len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def store(entry, name, value):
+        """
+        Store a result in an entry; cached arrays are shared between callers, so they are made read-only
+        """
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        entry[name] = value
+        return value
+
+    def eigenvalues(self, A):
+        """
+        Eigenvalues of A
+        """
+        entry = self.entry(A)
+        if 'eigenvalues' not in entry:
+            self.store(entry, 'eigenvalues', np.linalg.eigvals(entry['matrix']))
+        return entry['eigenvalues']
+
+    def eigenvectors(self, A):
+        """
+        Eigenvalues and right eigenvectors of A (computed on first request only)
+        """
+        entry = self.entry(A)
+        if 'eigenvectors' not in entry:
+            eigenvalues, eigenvectors = np.linalg.eig(entry['matrix'])
+            self.store(entry, 'eigenvalues', eigenvalues)
+            self.store(entry, 'eigenvectors', eigenvectors)
+        return entry['eigenvalues'], entry['eigenvectors']
+
+    def left_right_eigenvectors(self, A):
+        """
+        Eigenvalues, left eigenvectors and right eigenvectors of A (columns, as scipy.linalg.eig)
+        """
+        entry = self.entry(A)
+        if 'left_eigenvectors' not in entry:
+            eigenvalues, left, right = scipy.linalg.eig(entry['matrix'], left=True, right=True)
+            self.store(entry, 'eigenvalues', eigenvalues)
+            self.store(entry, 'left_eigenvectors', left)
+            self.store(entry, 'eigenvectors', right)
+        return entry['eigenvalues'], entry['left_eigenvectors'], entry['eigenvectors']
+
+    def continuous_eigenvalues(self, A, Ts):
+        """
+        Eigenvalues of the continuous-time matrix logm(A) / Ts, computed as log(lambda) / Ts from the
+        eigenvalues of A without forming the matrix logarithm (principal branch, as logm)
+        """
+        return np.log(self.eigenvalues(A).astype(complex)) / Ts
+
+    def logarithm(self, A):
+        """
+        Principal matrix logarithm logm(A) (unscaled), for callers that need the continuous matrix
+        """
+        entry = self.entry(A)
+        if 'logarithm' not in entry:
+            self.store(entry, 'logarithm', scipy.linalg.logm(entry['matrix']))
+        return entry['logarithm']
+
+    def clear(self):
+        """
+        Remove all entries
+        """
+        with self.lock:
+            self.entries.clear()
@@ -1,12 +1,12 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
+from matplotlib.transforms import Bbox
 
 class EigenvalueMonitor:
     def __init__(self, state_space_model):
         self.state_space_model = state_space_model
         self.fig, self.ax = plt.subplots()
-        self.eigenvalue_markers = []
 
         # Initial plot settings
         self.ax.set_xlabel('Real Part')
@@ -27,6 +27,15 @@ class EigenvalueMonitor:
         self.ax.yaxis.set_major_locator(ticker.SymmetricalLogLocator(base=2, linthresh=10))
         self.ax.yaxis.set_major_formatter(ticker.FuncFormatter(self.custom_formatter))
 
+        # Two persistent marker artists (stable / unstable eigenvalues) whose data is replaced on
+        # every update; they are animated, i.e. drawn only by blitting over the cached background
+        self.stable_markers, = self.ax.plot([], [], 'x', markersize=10, color='green', linestyle='none', animated=True)
+        self.unstable_markers, = self.ax.plot([], [], 'x', markersize=10, color='red', linestyle='none', animated=True)
+        self.background = None
+
+        # Recapture the background whenever the whole figure is redrawn (first draw, resize, ...)
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
     def custom_formatter(self, y, pos):
         """Custom formatter for axis labels, displaying in kHz where appropriate."""
         abs_y = np.abs(y)
@@ -35,15 +44,35 @@ class EigenvalueMonitor:
         else:
             return f'{abs_y:.0f}'
 
-    def update_eigenvalues(self):
-        """Update and plot eigenvalues in real-time."""
-        eigenvalues = self.state_space_model.calculate_eigenvalues()
+    def on_draw(self, event):
+        """Cache the background without the markers after a full redraw, then draw the markers on it."""
+        self.background = self.fig.canvas.copy_from_bbox(self.blit_bbox())
+        self.draw_markers()
+
+    def blit_bbox(self):
+        """Region restored and blitted on updates: the axes padded by half a marker, since markers clipped at the edge paint beyond it."""
+        pad = (self.stable_markers.get_markersize() / 2 + self.stable_markers.get_markeredgewidth()) * self.fig.dpi / 72 + 1
+        x0, y0, x1, y1 = self.ax.bbox.extents
+        return Bbox.from_extents(x0 - pad, y0 - pad, x1 + pad, y1 + pad)
 
-        # Remove existing markers if present
-        for marker in self.eigenvalue_markers:
-            marker.remove()
+    def draw_markers(self):
+        """Draw only the marker artists."""
+        self.ax.draw_artist(self.stable_markers)
+        self.ax.draw_artist(self.unstable_markers)
 
-        self.eigenvalue_markers.clear()
+    def draw_root_locus(self, root_locus_table):
+        """Draw the precomputed root locus of both gain signs as a static background trace."""
+        colors = ('lightgray', 'lightsteelblue')  # Positive / inverted gain
+        for sign_index, color in enumerate(colors):
+            trace = root_locus_table.trace(sign_index)
+            self.ax.plot(np.real(trace), np.imag(trace) / (2 * np.pi), ',', color=color, zorder=0)
+        self.background = None  # The next update redraws the figure and captures the new background
+
+    def update_eigenvalues(self, analysis=None):
+        """Update and plot eigenvalues of a ClosedLoopAnalysis in real-time (of the current gain unless given)."""
+        if analysis is None:
+            analysis = self.state_space_model.analyze_closed_loop()
+        eigenvalues = analysis.eigenvalues
 
         # Calculate real and imaginary parts
         real_parts = np.real(eigenvalues)
@@ -51,13 +80,20 @@ class EigenvalueMonitor:
         # Update y-axis values to scale by 2*pi
         imag_parts = np.imag(eigenvalues) / (2 * np.pi)
 
-        # Plot each eigenvalue with appropriate color
-        for real, imag in zip(real_parts, imag_parts):
-            color = 'green' if real < 0 else 'red'  # Green for negative, red for positive real part
-            marker, = self.ax.plot(real, imag, 'x', markersize=10, color=color)
-            self.eigenvalue_markers.append(marker)
+        # Green for negative, red for positive real part
+        stable = analysis.stable_mask()
+        self.stable_markers.set_data(real_parts[stable], imag_parts[stable])
+        self.unstable_markers.set_data(real_parts[~stable], imag_parts[~stable])
 
-        self.fig.canvas.draw()
+        canvas = self.fig.canvas
+        if self.background is None:
+            # No cached background yet: a full draw captures it (see on_draw)
+            canvas.draw()
+        else:
+            # Restore the axes background and blit only the marker layer
+            canvas.restore_region(self.background)
+            self.draw_markers()
+            canvas.blit(self.blit_bbox())
 
     def show_plot(self):
         """Display the plot."""
@@ -0,0 +1,76 @@
+import queue
+import threading
+
+class EigenvalueWorker:
+    def __init__(self, state_space_model, root, result_callback, poll_interval=15):
+        """
+        Analyze the closed loop on a background thread for the gains requested by the GUI.
+        Requests are coalesced (latest value wins): while one computation runs, newer gains replace
+        the pending one, so a fast slider drag costs one computation per effective gain.
+        Results are passed to result_callback(gain, analysis) (a ClosedLoopAnalysis) on the Tk thread, by polling a
+        queue with root.after (Tk must only be used from the thread that runs its main loop).
+        poll_interval: Milliseconds between two polls of the result queue
+        """
+        self.state_space_model = state_space_model
+        self.root = root
+        self.result_callback = result_callback
+        self.poll_interval = poll_interval
+
+        self.condition = threading.Condition()
+        self.pending_gain = None
+        self.running = True
+        self.results = queue.Queue()
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.root.after(self.poll_interval, self.poll_results)
+
+    def request(self, gain):
+        """
+        Ask for the analysis of the given gain, replacing any request not yet started.
+        """
+        with self.condition:
+            self.pending_gain = gain
+            self.condition.notify()
+
+    def run(self):
+        """
+        Worker loop: wait for a request, take the latest gain, compute, post the result.
+        """
+        while True:
+            with self.condition:
+                while self.pending_gain is None and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                gain, self.pending_gain = self.pending_gain, None
+
+            try:
+                analysis = self.state_space_model.analyze_closed_loop(gain)
+            except ValueError as error:  # e.g. 1 + gain * D == 0
+                print(f"Eigenvalue computation failed for gain {gain}: {error}")
+                continue
+            self.results.put((gain, analysis))
+
+    def poll_results(self):
+        """
+        Deliver the most recent result (if any) on the Tk thread and schedule the next poll.
+        """
+        latest = None
+        while True:
+            try:
+                latest = self.results.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            self.result_callback(*latest)
+        if self.running:
+            self.root.after(self.poll_interval, self.poll_results)
+
+    def stop(self):
+        """
+        Stop the worker thread and the polling.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
@@ -0,0 +1,42 @@
+import numpy as np
+import scipy.linalg
+
+class LinearSolver:
+    def __init__(self, matrix, max_attempts=10):
+        """
+        Factor a symmetric positive (semi-)definite matrix once for repeated solves
+        A Cholesky factorization is tried first; if the matrix is singular or indefinite
+        a diagonal regularization is added and increased tenfold until it succeeds
+        """
+        self.matrix = matrix
+        self.regularization = 0.0
+        self.factor = self.factorize(matrix, max_attempts)
+
+    def factorize(self, matrix, max_attempts):
+        """
+        Compute the Cholesky factor, regularizing when needed
+        """
+        size = matrix.shape[0]
+        scale = max(np.trace(matrix) / size, np.finfo(float).tiny)
+        jitter = np.finfo(float).eps * scale
+        for attempt in range(max_attempts + 1):
+            try:
+                return scipy.linalg.cho_factor(matrix + self.regularization * np.eye(size))
+            except np.linalg.LinAlgError:
+                self.regularization = jitter * 10 ** attempt
+        raise np.linalg.LinAlgError("Matrix could not be factorized even with regularization.")
+
+    def solve(self, rhs):
+        """
+        Solve matrix @ x = rhs using the cached factorization
+        """
+        return scipy.linalg.cho_solve(self.factor, rhs)
+
+    @staticmethod
+    def least_squares(matrix, rhs):
+        """
+        Solve min ||matrix @ x - rhs|| with a rank-revealing QR factorization
+        (replaces pinv(matrix) @ rhs without forming the pseudo-inverse)
+        """
+        solution, _, _, _ = scipy.linalg.lstsq(matrix, rhs, lapack_driver='gelsy')
+        return solution
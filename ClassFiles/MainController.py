@@ -1,15 +1,19 @@
 import os
 import tkinter as tk
+import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from ClassFiles.StateSpaceModel import StateSpaceModel
+from ClassFiles.ClosedLoopAnalysis import ClosedLoopAnalysis
 from ClassFiles.EigenvalueMonitor import EigenvalueMonitor
 from ClassFiles.SliderController import SliderController
 from ClassFiles.InvertController import InvertController
 from ClassFiles.WarningSystem import WarningSystem
+from ClassFiles.EigenvalueWorker import EigenvalueWorker
+from ClassFiles.RootLocusTable import RootLocusTable
 from ClassFiles.FileHandler import FileHandler
 
 class MainController:
-    def __init__(self, input_file):
+    def __init__(self, input_file, precompute_root_locus=False):
         self.root = tk.Tk()
         self.root.title("Howling Simulator")
         
@@ -25,6 +29,22 @@ class MainController:
         self.eigen_monitor = EigenvalueMonitor(self.state_space_model)
         self.warning_system = WarningSystem(self.slider_controller)
 
+        # Closed-loop analyses are computed off the Tk thread; results come back through the slider's main loop
+        self.eigenvalue_worker = EigenvalueWorker(self.state_space_model, self.slider_controller.root, self.show_analysis)
+
+        # Report the gains at which the loop starts howling (one frequency sweep, no eigenvalue solves)
+        for sign in (1.0, -1.0):
+            margin = self.state_space_model.howling_margin(sign)
+            if margin is not None:
+                print(f"Critical gain {margin[0]:+.4f} ({20 * np.log10(abs(margin[0])):.2f} dB), howling at {margin[1]:.1f} Hz")
+
+        # Optionally precompute the poles of every slider position (lookup instead of computation)
+        self.root_locus_table = None
+        if precompute_root_locus:
+            self.root_locus_table = RootLocusTable(self.state_space_model, max_db=self.slider_controller.MAX)
+            self.root_locus_table.compute()
+            self.eigen_monitor.draw_root_locus(self.root_locus_table)
+
         # Initialize UI
         self.init_ui()
 
@@ -37,6 +57,9 @@ class MainController:
             command=self.save_gain
         )
         self.save_button.pack(side=tk.TOP, pady=10, anchor='nw')
+
+        # The main loop runs on the slider window; stop the eigenvalue worker when it is closed
+        self.slider_controller.root.protocol("WM_DELETE_WINDOW", self.close)
         
         # Embed the figure in Tkinter Canvas
         self.fig = self.eigen_monitor.fig
@@ -45,9 +68,31 @@ class MainController:
         self.canvas.draw()
 
     def update_view(self):
-        """Update the eigenvalues visualization based on state space model changes"""
-        self.eigen_monitor.update_eigenvalues()
-        self.warning_system.check_stability()
+        """Request the closed-loop analysis for the current gain (slider and invert changes end up here)"""
+        gain = self.state_space_model.gain
+        analysis = self.state_space_model.cached_analysis(gain)
+        if analysis is None and self.root_locus_table is not None:
+            eigenvalues = self.root_locus_table.lookup(gain)
+            if eigenvalues is not None:
+                dt = self.state_space_model.calculate_control_period(self.state_space_model.sampling_period)
+                analysis = ClosedLoopAnalysis(gain, eigenvalues, dt)
+        if analysis is not None:
+            self.show_analysis(gain, analysis)
+        else:
+            self.eigenvalue_worker.request(gain)
+
+    def show_analysis(self, gain, analysis):
+        """Update the eigenvalues visualization and the stability check with one computed result"""
+        # The worker may deliver a gain that a cached or table result has already superseded
+        if gain != self.state_space_model.gain:
+            return
+        self.eigen_monitor.update_eigenvalues(analysis)
+        self.warning_system.check_stability(analysis)
+
+    def close(self):
+        """Stop the eigenvalue worker (thread and result polling) and close the slider window"""
+        self.eigenvalue_worker.stop()
+        self.slider_controller.root.destroy()
 
     def save_gain(self):
         """Save the gain value to a CSV file"""
@@ -0,0 +1,56 @@
+import numpy as np
+
+class PrecisionPolicy:
+    def __init__(self, data_dtype=np.float64):
+        """
+        Describe the floating-point precision used by the identification and simulation classes
+        data_dtype: Precision of the long signal-length arrays (audio, Hankel views, FFTs,
+                    regression matrices, simulated time series)
+        Small dense factorizations and solves always run in float64 (compute_dtype)
+        """
+        self.data_dtype = np.dtype(data_dtype)
+        self.compute_dtype = np.dtype(np.float64)
+        if self.data_dtype not in (np.dtype(np.float32), np.dtype(np.float64)):
+            raise ValueError(f"Unsupported data precision: {self.data_dtype}")
+
+    def as_data(self, array):
+        """
+        Convert a signal-length array to the data precision (no copy if it already matches)
+        """
+        return np.asarray(array, dtype=self.data_dtype)
+
+    def as_compute(self, array):
+        """
+        Convert a small matrix to the compute precision (no copy if it already matches)
+        """
+        return np.asarray(array, dtype=self.compute_dtype)
+
+    @staticmethod
+    def compare_models(reference, candidate, num_markov=100):
+        """
+        Compare two identified discrete-time models (A, B, C, D)
+        Returns a report with the relative error of the first num_markov Markov parameters
+        (D, CB, CAB, ...), i.e. of the impulse response, and of the largest pole magnitude
+        """
+        def markov_parameters(A, B, C, D):
+            parameters = [np.asarray(D, dtype=np.float64).ravel()]
+            state = np.asarray(B, dtype=np.float64)
+            for _ in range(num_markov - 1):
+                parameters.append((C @ state).ravel())
+                state = A @ state
+            return np.concatenate(parameters)
+
+        markov_reference = markov_parameters(*reference)
+        markov_candidate = markov_parameters(*candidate)
+        markov_error = np.linalg.norm(markov_candidate - markov_reference) / np.linalg.norm(markov_reference)
+
+        radius_reference = np.max(np.abs(np.linalg.eigvals(reference[0])))
+        radius_candidate = np.max(np.abs(np.linalg.eigvals(candidate[0])))
+        radius_error = abs(radius_candidate - radius_reference) / radius_reference
+
+        return {
+            'markov_relative_error': markov_error,
+            'spectral_radius_reference': radius_reference,
+            'spectral_radius_candidate': radius_candidate,
+            'spectral_radius_relative_error': radius_error
+        }
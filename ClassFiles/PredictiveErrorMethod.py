@@ -1,20 +1,319 @@
 import numpy as np
+import scipy.sparse.linalg
+from ClassFiles.BlockToeplitzSolver import BlockToeplitzSolver
+from ClassFiles.CorrelationEngine import CorrelationEngine
+from ClassFiles.LinearSolver import LinearSolver
+from ClassFiles.PrecisionPolicy import PrecisionPolicy
 
 # A class for system identification using the Predictive Error Method
 class PredictiveErrorMethod:
 
-    def __init__(self, input_data, output_data, system_order):
+    def __init__(self, input_data, output_data, system_order, precision=None, structured_max_iterations=100, structured_tolerance=1e-12):
         """
         Initialization function. Sets the input signal, output signal, and system order.
+        structured_max_iterations and structured_tolerance configure the preconditioned conjugate
+        gradient of the 'toeplitz' solver (see solve_structured).
+        The signals and the regression matrix use the data precision of the PrecisionPolicy
+        (float64 by default); the normal equations are always solved in float64.
+        input_data and output_data may be None when the data is fed block by block through
+        accumulate_block or update_recursive.
         """
-        self.input_data = input_data
-        self.output_data = output_data
+        self.precision = precision if precision is not None else PrecisionPolicy()
+        self.input_data = None if input_data is None else self.precision.as_data(input_data)
+        self.output_data = None if output_data is None else self.precision.as_data(output_data)
         self.system_order = system_order
+        self.structured_max_iterations = structured_max_iterations
+        self.structured_tolerance = structured_tolerance
+        self.reset_accumulator()
 
-    def estimate_ab_coefficients(self):
+    def build_regression_matrix(self, input_data=None, output_data=None, first_row=None):
+        """
+        Builds the regression matrix Omega and the target vector from lagged windows of the data.
+
+        Row k of Omega is [-y(k-1), ..., -y(k-n), u(k), ..., u(k-n+1)] and its target is y(k),
+        for k = first_row, ..., N-1 (first_row defaults to n+1).
+
+        Parameters:
+        -----------
+        input_data, output_data : np.ndarray
+            Signals to use instead of the ones given at initialization (e.g. one block of a stream).
+        first_row : int
+            First sample index k to regress; must be at least n.
+
+        Returns:
+        --------
+        Omega : np.ndarray
+            Regression matrix of shape (N - first_row, 2n).
+        y_vector : np.ndarray
+            Output samples y(k) that each row of Omega predicts.
+        """
+        input_data = self.input_data if input_data is None else input_data
+        output_data = self.output_data if output_data is None else output_data
+        N = len(output_data)
+        n = self.system_order
+        first_row = n + 1 if first_row is None else first_row
+
+        # Each window is a read-only view of n consecutive samples; reversing it gives the lag order
+        y_windows = np.lib.stride_tricks.sliding_window_view(output_data, n)
+        u_windows = np.lib.stride_tricks.sliding_window_view(input_data, n)
+
+        Omega = np.empty((N - first_row, 2 * n), dtype=self.precision.data_dtype)
+        np.negative(y_windows[first_row - n:N - n, ::-1], out=Omega[:, :n])
+        Omega[:, n:] = u_windows[first_row - n + 1:N - n + 1, ::-1]
+        y_vector = output_data[first_row:N]
+
+        return Omega, y_vector
+
+    def reset_accumulator(self):
+        """
+        Clears the normal-equation sums used by the block-wise mode.
+        """
+        size = 2 * self.system_order
+        self.OmegaT_Omega = np.zeros((size, size))
+        self.OmegaT_y = np.zeros(size)
+        self.num_rows = 0
+        self.input_carry = None
+        self.output_carry = None
+        self.next_first_row = self.system_order + 1
+
+    def extend_with_carry(self, input_block, output_block):
+        """
+        Prepends the samples carried over from previous blocks and returns the buffers together
+        with the first row that can be regressed (None buffers if no row is complete yet).
+        The very first row is n+1, like build_regression_matrix; afterwards the last n samples
+        are carried so every later row is regressed exactly once.
+        """
+        n = self.system_order
+        input_block = self.precision.as_data(input_block)
+        output_block = self.precision.as_data(output_block)
+        if self.input_carry is not None:
+            input_block = np.concatenate((self.input_carry, input_block))
+            output_block = np.concatenate((self.output_carry, output_block))
+
+        first_row = self.next_first_row
+        if len(output_block) <= first_row:
+            # Too short to form a row yet: keep everything for the next block
+            self.input_carry = np.array(input_block)
+            self.output_carry = np.array(output_block)
+            return None, None, first_row
+
+        self.next_first_row = n
+        self.input_carry = np.array(input_block[-n:])
+        self.output_carry = np.array(output_block[-n:])
+        return input_block, output_block, first_row
+
+    def accumulate_block(self, input_block, output_block):
+        """
+        Adds one block of input/output samples to the normal equations Omega^T Omega and Omega^T y.
+        Only a (block x 2n) slice of Omega exists at any time, so memory does not grow with the data.
+        """
+        input_block, output_block, first_row = self.extend_with_carry(input_block, output_block)
+        if input_block is None:
+            return
+
+        Omega, y_vector = self.build_regression_matrix(input_block, output_block, first_row)
+        self.OmegaT_Omega += self.precision.as_compute(Omega.T @ Omega)
+        self.OmegaT_y += self.precision.as_compute(Omega.T @ y_vector)
+        self.num_rows += len(y_vector)
+
+    def finalize_accumulation(self):
+        """
+        Solves the accumulated normal equations and converts the result to state space.
+
+        Returns:
+        --------
+        A, B, C, D : np.ndarray
+            State-space matrices in controllable canonical form.
+        """
+        if self.num_rows == 0:
+            raise ValueError("No complete regression rows have been accumulated.")
+        n = self.system_order
+        theta = LinearSolver(self.OmegaT_Omega).solve(self.OmegaT_y)
+        return self.transfer_function_to_state_space(theta[:n], theta[n:])
+
+    def init_recursive(self, forgetting_factor=0.999, initial_covariance=1e3):
+        """
+        Initializes exponentially-forgetting recursive least squares (RLS).
+
+        Parameters:
+        -----------
+        forgetting_factor : float
+            Weight applied to past samples at every step (1.0 means no forgetting).
+        initial_covariance : float
+            Scale of the initial covariance matrix (large values adapt quickly at the start).
+        """
+        size = 2 * self.system_order
+        self.forgetting_factor = forgetting_factor
+        self.theta = np.zeros(size)
+        self.covariance = initial_covariance * np.eye(size)
+        self.input_carry = None
+        self.output_carry = None
+        self.next_first_row = self.system_order + 1
+
+    def update_recursive(self, input_block, output_block):
+        """
+        Updates the ARX coefficients with a new block of samples using RLS.
+
+        Returns:
+        --------
+        a : np.ndarray
+            Current coefficient vector for the denominator of the transfer function.
+        b : np.ndarray
+            Current coefficient vector for the numerator of the transfer function.
+        """
+        n = self.system_order
+        input_block, output_block, first_row = self.extend_with_carry(input_block, output_block)
+        if input_block is not None:
+            Omega, y_vector = self.build_regression_matrix(input_block, output_block, first_row)
+            theta = self.theta
+            P = self.covariance
+            lam = self.forgetting_factor
+            for phi, y in zip(self.precision.as_compute(Omega), self.precision.as_compute(y_vector)):
+                P_phi = P @ phi
+                gain = P_phi / (lam + phi @ P_phi)
+                theta += gain * (y - phi @ theta)
+                P -= np.outer(gain, P_phi)
+                P /= lam
+
+            # Keep the covariance symmetric against round-off drift
+            self.covariance = (P + P.T) / 2
+
+        return self.theta[:n].copy(), self.theta[n:].copy()
+
+    def build_lag_normal_equations(self):
+        """
+        Builds the normal equations Omega^T Omega theta = Omega^T y from lag correlations.
+
+        The columns are reordered by lag into 2-element blocks z = [-y(k-i), u(k-i+1)], i = 1 ... n,
+        which makes the Gram matrix (nearly) block-Toeplitz. The correlations come from the FFT
+        in O(N log N), so Omega is never formed.
+
+        Returns:
+        --------
+        G : np.ndarray
+            Gram matrix (2n x 2n) in the interleaved block ordering.
+        g : np.ndarray
+            Right-hand side of shape (n, 2) in the same ordering.
+        """
+        N = len(self.output_data)
+        n = self.system_order
+
+        # Block a of row k = n+1+t holds -y(1+t+a) and u(2+t+a); the target y(k) is -s1(t+n)
+        s1 = -self.output_data[1:N]
+        s2 = np.concatenate((self.input_data[2:N], np.zeros(1, dtype=self.precision.data_dtype)))
+        engine = CorrelationEngine(n + 1, self.precision.data_dtype)
+        signals = (s1, s2)
+        M = np.array([[engine.lagged_correlation(x, z) for z in signals] for x in signals])
+
+        G = M[:, :, :n, :n].transpose(2, 0, 3, 1).reshape(2 * n, 2 * n)
+        g = -M[:, 0, :n, n].T
+        return G, g
+
+    def solve_structured(self, G, g, structure_tolerance=0.5, max_iterations=None, tolerance=None, stall_iterations=5):
+        """
+        Solves the interleaved normal equations with a block Levinson solver.
+
+        The block-Toeplitz matrix built from the first block row of G is used as the preconditioner
+        of a conjugate gradient solve against the exact G, so the result matches the dense solution.
+        The iteration stops once the normwise backward error ||r|| / (||G|| ||x|| + ||g||) is below
+        tolerance, i.e. as accurate as the dense solve.
+        The iteration contracts by about cond(T) * ||G - T|| / ||G|| per step, so it is only attempted
+        when that bound (with a 1-norm estimate of cond(T) from a few Levinson solves) is below
+        structure_tolerance; on ill-conditioned (colored) data the dense solve is used right away.
+        Falls back to a dense Cholesky solve (and says why) when the recursion meets a singular or
+        non-finite pivot (e.g. an impulse or muted signal), the bound is too large, the residual
+        stops decreasing for stall_iterations iterations, or max_iterations is reached.
+        max_iterations and tolerance default to the values given to the constructor.
+
+        Returns:
+        --------
+        x : np.ndarray
+            Solution of shape (n, 2) in the interleaved ordering.
+        """
+        n = self.system_order
+        max_iterations = self.structured_max_iterations if max_iterations is None else max_iterations
+        tolerance = self.structured_tolerance if tolerance is None else tolerance
+        blocks = G[:2, :].reshape(2, n, 2).transpose(1, 0, 2)
+        G_norm = np.linalg.norm(G)
+        try:
+            # A singular leading block (e.g. an impulse or muted input) breaks the Levinson recursion
+            toeplitz_solver = BlockToeplitzSolver(blocks)
+            T = toeplitz_solver.dense_matrix()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                deviation = np.linalg.norm(G - T) / G_norm
+            condition = self.toeplitz_condition(T, toeplitz_solver)
+        except np.linalg.LinAlgError as error:
+            toeplitz_solver = None
+            reason = f"the block Levinson recursion failed ({error})"
+
+        if toeplitz_solver is None:
+            pass  # reason is set above
+        elif not np.isfinite(condition * deviation):
+            reason = "the block-Toeplitz preconditioner is singular"
+        elif condition * deviation > structure_tolerance:
+            reason = f"cond(T) ~ {condition:.1e} times the deviation {deviation:.1e} from block-Toeplitz is too large"
+        else:
+            rhs = g.ravel()
+            rhs_norm = np.linalg.norm(rhs)
+            x = np.zeros_like(rhs)
+            residual = rhs.copy()
+            preconditioned = toeplitz_solver.solve(residual.reshape(n, 2)).ravel()
+            direction = preconditioned.copy()
+            residual_dot = residual @ preconditioned
+            best_residual, best_iteration = np.inf, 0
+            reason = f"no convergence in {max_iterations} iterations"
+            for iteration in range(max_iterations):
+                G_direction = G @ direction
+                step = residual_dot / (direction @ G_direction)
+                x += step * direction
+                residual -= step * G_direction
+                residual_norm = np.linalg.norm(residual)
+                if residual_norm <= tolerance * (G_norm * np.linalg.norm(x) + rhs_norm):
+                    return x.reshape(n, 2)
+                if residual_norm < best_residual:
+                    best_residual, best_iteration = residual_norm, iteration
+                elif iteration - best_iteration >= stall_iterations:
+                    reason = f"stalled at a relative residual of {best_residual / rhs_norm:.1e}"
+                    break
+                preconditioned = toeplitz_solver.solve(residual.reshape(n, 2)).ravel()
+                new_residual_dot = residual @ preconditioned
+                direction = preconditioned + (new_residual_dot / residual_dot) * direction
+                residual_dot = new_residual_dot
+
+        print(f"Falling back to the dense solver for the PEM normal equations ({reason}).")
+        return LinearSolver(G).solve(g.ravel()).reshape(n, 2)
+
+    @staticmethod
+    def toeplitz_condition(T, toeplitz_solver):
+        """
+        Estimate the 1-norm condition number of the block-Toeplitz matrix T, using its Levinson
+        solver for the products with T^-1 (T is symmetric, so T^-1 is its own transpose)
+        """
+        size = T.shape[0]
+        d = toeplitz_solver.blocks.shape[1]
+
+        def solve(v):
+            v = np.asarray(v, dtype=np.float64).reshape(size, -1)
+            return np.column_stack([toeplitz_solver.solve(column.reshape(-1, d)).ravel() for column in v.T])
+
+        inverse = scipy.sparse.linalg.LinearOperator((size, size), matvec=solve, rmatvec=solve, matmat=solve, dtype=np.float64)
+        with np.errstate(all='ignore'):
+            inverse_norm = scipy.sparse.linalg.onenormest(inverse)
+        return np.linalg.norm(T, 1) * inverse_norm if np.isfinite(inverse_norm) else np.inf
+
+    def estimate_ab_coefficients(self, solver='cholesky'):
         """
         Estimates the a and b coefficients of the discrete-time transfer function using 
         the least squares method.
+
+        Parameters:
+        -----------
+        solver : str
+            'cholesky' solves the normal equations with a Cholesky factorization,
+            'lstsq' solves the least-squares problem on Omega directly with QR
+            (slower, but better conditioned at high orders),
+            'toeplitz' builds the normal equations from lag correlations and solves them
+            with a block Levinson method (never forms Omega).
         
         Returns:
         --------
@@ -23,32 +322,26 @@ class PredictiveErrorMethod:
         b : np.ndarray
             Coefficient vector for the numerator of the transfer function.
         """
-        N = len(self.output_data)
         n = self.system_order
-        m = n - 1  # Typically, m = n - 1 as per the given document
+
+        if solver == 'toeplitz':
+            G, g = self.build_lag_normal_equations()
+            x = self.solve_structured(G, g)
+            # Undo the interleaving: block a holds lag n-a of y and lag n-1-a of u
+            return x[::-1, 0], x[::-1, 1]
 
         # Construct Omega matrix for the least squares problem
-        Omega = []
-        y_vector = []
-        
-        for k in range(n, N):
-            # Ensure we are within the valid index range for both input and output signals
-            if k >= n and k >= m:
-                # Construct each row of Omega
-                y_terms = -self.output_data[k-1:k-n-1:-1] if k-n >= 0 else []
-                u_terms = self.input_data[k:k-m-1:-1] if k-m >= 0 else []
-
-                # Check if both y_terms and u_terms are valid and of the correct length
-                if len(y_terms) == n and len(u_terms) == m + 1:
-                    Omega.append(np.hstack([y_terms, u_terms]))
-                    # Output data (y) from k to N
-                    y_vector.append(self.output_data[k])
-
-        Omega = np.array(Omega)
-        y_vector = np.array(y_vector)
+        Omega, y_vector = self.build_regression_matrix()
 
         # Solve the least squares problem to find the coefficients
-        theta = np.linalg.inv(Omega.T @ Omega) @ Omega.T @ y_vector
+        if solver == 'cholesky':
+            OmegaT_Omega = self.precision.as_compute(Omega.T @ Omega)
+            OmegaT_y = self.precision.as_compute(Omega.T @ y_vector)
+            theta = LinearSolver(OmegaT_Omega).solve(OmegaT_y)
+        elif solver == 'lstsq':
+            theta = LinearSolver.least_squares(self.precision.as_compute(Omega), self.precision.as_compute(y_vector))
+        else:
+            raise ValueError(f"Unknown solver: {solver}")
         
         # Split theta into a (denominator) and b (numerator) coefficients
         a = theta[:n]
@@ -98,10 +391,16 @@ class PredictiveErrorMethod:
 
         return A, B, C, D
 
-    def identify_state_space(self):
+    def identify_state_space(self, solver='cholesky'):
         """
         Combines the estimation of a and b coefficients and the conversion to state-space
         matrices A, B, C, D.
+
+        Parameters:
+        -----------
+        solver : str
+            Solver for the least-squares problem ('cholesky', 'lstsq' or 'toeplitz'),
+            see estimate_ab_coefficients.
         
         Returns:
         --------
@@ -115,7 +414,7 @@ class PredictiveErrorMethod:
             Feedthrough matrix.
         """
         # Step 1: Estimate the transfer function coefficients a and b
-        a, b = self.estimate_ab_coefficients()
+        a, b = self.estimate_ab_coefficients(solver)
 
         # Step 2: Convert the transfer function to state-space representation
         A, B, C, D = self.transfer_function_to_state_space(a, b)
@@ -0,0 +1,120 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from ClassFiles.RootLocusTracker import RootLocusTracker
+
+class RootLocusTable:
+    def __init__(self, state_space_model, max_db=36, resolution=0.1, max_workers=None):
+        """
+        Precompute the closed-loop poles of every slider position (gains of -max_db ... max_db dB in
+        steps of resolution, for both gain signs), so slider updates become a table lookup
+        Pole k of every row belongs to the same branch of the root locus (eigenvalue continuation),
+        which also allows interpolating between slider positions and drawing the locus as a trace
+        max_workers: Number of threads tracing segments of the gain range in parallel
+        """
+        self.state_space_model = state_space_model
+        self.resolution = resolution
+        self.db_values = np.round(np.arange(-max_db, max_db + resolution / 2, resolution), 6)
+        self.signs = (1.0, -1.0)
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.discrete_poles = None  # Array of shape (len(signs), len(db_values), n)
+
+    def compute(self):
+        """
+        Trace the locus for both signs; each sign is split into one contiguous dB segment per worker,
+        traced with its own RootLocusTracker, and the segments are joined by matching poles at the
+        segment boundaries
+        """
+        print(f"Precomputing closed-loop poles for {2 * len(self.db_values)} slider positions...")
+        num_segments = max(1, min(self.max_workers, len(self.db_values)))
+        bounds = np.linspace(0, len(self.db_values), num_segments + 1).astype(int)
+        jobs = [(sign, bounds[s], bounds[s + 1]) for sign in self.signs for s in range(num_segments)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            segments = list(pool.map(lambda job: self.trace_segment(*job), jobs))
+
+        rows = []
+        for i, _ in enumerate(self.signs):
+            sign_segments = segments[i * num_segments:(i + 1) * num_segments]
+            joined = [sign_segments[0]]
+            for segment in sign_segments[1:]:
+                order = self.match_poles(joined[-1][-1], segment[0])
+                joined.append(segment[:, order])
+            rows.append(np.concatenate(joined))
+        self.discrete_poles = np.stack(rows)
+        print("Root locus table completed.")
+        return self.discrete_poles
+
+    def trace_segment(self, sign, start, stop):
+        """
+        Track the poles over the slider positions start ... stop-1 of one gain sign
+        Whenever the tracker falls back to a full eigenvalue solve (arbitrary order), the poles are
+        re-matched to the previous position to keep the branch order
+        """
+        model = self.state_space_model
+        tracker = RootLocusTracker(model.system_matrix, model.input_matrix, model.output_matrix)
+        n = tracker.A.shape[0]
+        poles = np.full((stop - start, n), np.nan, dtype=complex)
+
+        previous = None
+        for row, db in enumerate(self.db_values[start:stop]):
+            try:
+                kappa = model.get_feedback_factor(sign * 10 ** (db / 20))
+            except ValueError:  # 1 + gain * D == 0 at this position
+                continue
+            fallbacks = tracker.fallback_count
+            current = tracker.poles(kappa)
+            if previous is not None and tracker.fallback_count > fallbacks:
+                current = current[self.match_poles(previous, current)]
+            poles[row] = current
+            previous = current
+        return poles
+
+    @staticmethod
+    def match_poles(previous, current):
+        """
+        Return the order of current that pairs every pole with the nearest pole of previous
+        (minimum total distance, Hungarian algorithm)
+        """
+        if np.any(~np.isfinite(previous)) or np.any(~np.isfinite(current)):
+            return np.arange(len(current))
+        cost = np.abs(previous[:, np.newaxis] - current[np.newaxis, :])
+        _, order = linear_sum_assignment(cost)
+        return order
+
+    def continuous_poles(self, discrete_poles):
+        """
+        Map discrete poles to continuous-time eigenvalues as StateSpaceModel.calculate_eigenvalues
+        """
+        dt = self.state_space_model.calculate_control_period(self.state_space_model.sampling_period)
+        return np.log(discrete_poles.astype(complex)) / dt
+
+    def lookup(self, gain):
+        """
+        Return the continuous-time closed-loop eigenvalues for a gain, or None if the table has not
+        been computed, the gain is outside the slider range or no poles exist there
+        Gains between two slider positions are interpolated linearly in dB along each branch
+        """
+        if self.discrete_poles is None or gain == 0:
+            return None
+        sign_index = 0 if gain > 0 else 1
+        position = (20 * np.log10(abs(gain)) - self.db_values[0]) / self.resolution
+        if position < -1e-6 or position > len(self.db_values) - 1 + 1e-6:
+            return None
+
+        lower = int(np.clip(np.floor(position + 1e-6), 0, len(self.db_values) - 1))
+        fraction = position - lower
+        if fraction < 1e-6 or lower == len(self.db_values) - 1:
+            poles = self.discrete_poles[sign_index, lower]
+        else:
+            poles = (1 - fraction) * self.discrete_poles[sign_index, lower] + fraction * self.discrete_poles[sign_index, lower + 1]
+        if not np.all(np.isfinite(poles)):
+            return None  # Position where 1 + gain * D == 0
+        return self.continuous_poles(poles)
+
+    def trace(self, sign_index=0):
+        """
+        Return all precomputed continuous-time poles of one gain sign as a flat array (for plotting)
+        """
+        return self.continuous_poles(self.discrete_poles[sign_index]).ravel()
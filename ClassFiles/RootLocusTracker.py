@@ -0,0 +1,114 @@
+import numpy as np
+from ClassFiles.EigenDecompositionCache import EigenDecompositionCache
+
+class RootLocusTracker:
+    def __init__(self, A, B, C, max_iterations=50, tolerance=1e-12, max_condition=1e8):
+        """
+        Track the poles of the closed loop A - kappa * B * C (kappa = g / (1 + g D) for output feedback
+        with gain g) as kappa changes, without solving the full eigenproblem for every kappa
+        With A = V diag(lambda) V^-1 and open-loop G0(z) = C (zI - A)^-1 B = sum_i r_i / (z - lambda_i),
+        the closed-loop poles are the roots of det(zI - A) (1 + kappa G0(z)), which are refined from
+        the poles of the previous kappa with the Aberth iteration (O(n^2) per iteration)
+        max_iterations: Iterations before falling back to the eigenvalues of the closed-loop matrix
+        tolerance: Relative step size at which a pole counts as converged
+        max_condition: Largest condition number of V for which the residues r_i are trusted
+        """
+        self.A = np.asarray(A, dtype=np.float64)
+        self.B = np.asarray(B, dtype=np.float64).reshape(-1, 1)
+        self.C = np.asarray(C, dtype=np.float64).reshape(1, -1)
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+
+        # Decomposition of the open loop, computed once
+        self.open_loop_poles, V = EigenDecompositionCache.shared().eigenvectors(self.A)
+        condition = np.linalg.cond(V)
+        self.enabled = np.isfinite(condition) and condition <= max_condition
+        if self.enabled:
+            self.residues = (self.C @ V).ravel() * np.linalg.solve(V, self.B.astype(complex)).ravel()
+        else:
+            print(f"Eigenvector matrix is ill-conditioned (cond = {condition:.2e}); root tracking disabled.")
+
+        # Trace of A_cl = trace(A) - kappa * C B gives a cheap check of the sum of the tracked poles
+        self.trace_A = np.trace(self.A)
+        self.CB = (self.C @ self.B).item()
+
+        self.previous_kappa = None
+        self.previous_poles = None
+        self.fallback_count = 0
+
+    def closed_loop_matrix(self, kappa):
+        """
+        Return the discrete closed-loop matrix A - kappa * B * C
+        """
+        return self.A - kappa * (self.B @ self.C)
+
+    def aberth(self, kappa, initial_poles):
+        """
+        Refine all n closed-loop poles simultaneously, starting from initial_poles
+        Returns the poles, or None if the iteration did not converge
+        """
+        lam = self.open_loop_poles
+        r = self.residues
+        z = np.array(initial_poles, dtype=complex)
+        n = len(z)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for _ in range(self.max_iterations):
+                inverse_open = 1.0 / (z[:, np.newaxis] - lam[np.newaxis, :])  # 1 / (z_k - lambda_i)
+                f = 1.0 + kappa * (inverse_open @ r)
+                df = -kappa * ((inverse_open ** 2) @ r)
+
+                # Newton correction p / p' of p(z) = det(zI - A) (1 + kappa G0(z))
+                newton = 1.0 / (inverse_open.sum(axis=1) + df / f)
+                newton[~np.isfinite(newton)] = 0.0  # z_k sits on a pole that does not move (r_i = 0)
+
+                # Aberth correction keeps the iterates apart: sum over j != k of 1 / (z_k - z_j)
+                difference = z[:, np.newaxis] - z[np.newaxis, :]
+                np.fill_diagonal(difference, np.inf)
+                repulsion = (1.0 / difference).sum(axis=1)
+                step = newton / (1.0 - newton * repulsion)
+                if not np.all(np.isfinite(step)):
+                    return None
+
+                z = z - step
+                if np.all(np.abs(step) <= self.tolerance * np.maximum(1.0, np.abs(z))):
+                    break
+            else:
+                return None
+
+        # The poles must sum to the trace of the closed-loop matrix
+        expected_trace = self.trace_A - kappa * self.CB
+        if abs(z.sum() - expected_trace) > 1e-8 * n * max(1.0, np.max(np.abs(z))):
+            return None
+
+        # A pole that is its own nearest conjugate is real; drop its rounding-level imaginary part
+        # (a tiny negative imaginary part would put log(z) on the wrong branch for z < 0)
+        conjugate_distance = np.abs(z[:, np.newaxis] - np.conj(z)[np.newaxis, :])
+        real = np.argmin(conjugate_distance, axis=1) == np.arange(n)
+        z[real] = z[real].real
+        return z
+
+    def poles(self, kappa):
+        """
+        Return the discrete closed-loop poles for kappa, warm-started from the previous call
+        Falls back to the eigenvalues of A - kappa * B * C if tracking fails
+        """
+        if kappa == 0:
+            poles = np.array(self.open_loop_poles, dtype=complex)
+        elif self.enabled:
+            if self.previous_poles is None or self.previous_kappa == 0:
+                # First-order perturbation of every open-loop pole: lambda_i - kappa * r_i
+                initial_poles = self.open_loop_poles - kappa * self.residues
+            else:
+                initial_poles = self.previous_poles
+            poles = self.aberth(kappa, initial_poles)
+        else:
+            poles = None
+
+        if poles is None:
+            self.fallback_count += 1
+            poles = np.linalg.eigvals(self.closed_loop_matrix(kappa)).astype(complex)
+
+        self.previous_kappa = kappa
+        self.previous_poles = poles
+        return poles
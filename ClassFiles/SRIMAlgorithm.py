@@ -1,16 +1,31 @@
+import time
 import numpy as np
+import scipy.linalg
+from ClassFiles.CorrelationEngine import CorrelationEngine
+from ClassFiles.LinearSolver import LinearSolver
+from ClassFiles.PrecisionPolicy import PrecisionPolicy
 
 class SRIMAlgorithm:
-    def __init__(self, n, m, r, l, Y, U, mode):
+    DECOMPOSITION_METHODS = ('svd', 'eigh', 'eigh_partial', 'randomized')
+
+    def __init__(self, n, m, r, l, Y, U, mode, decomposition_method='svd', precision=None):
         """
         Initialize the class
         n: System order
         m: Number of outputs
         r: Number of inputs
         l: Length of data
-        Y: Output data matrix (m x l)
-        U: Input data matrix (r x l)
+        Y: Output data matrix (m x l), or None when fed through accumulate_block
+        U: Input data matrix (r x l), or None when fed through accumulate_block
+        decomposition_method: Backend for the decomposition of Rhh
+            'svd'          full singular value decomposition (reference)
+            'eigh'         symmetric eigendecomposition (Rhh is symmetric PSD)
+            'eigh_partial' eigensolver for the n largest eigenpairs only
+            'randomized'   randomized range finder for the n dominant directions
+        precision: PrecisionPolicy for the signal-length stages (float64 everywhere by default)
         """
+        if decomposition_method not in self.DECOMPOSITION_METHODS:
+            raise ValueError(f"Unknown decomposition method: {decomposition_method}")
         self.n = n
         self.m = m
         self.r = r
@@ -19,6 +34,10 @@ class SRIMAlgorithm:
         self.U = U
         self.p = self.select_p()
         self.mode = mode
+        self.decomposition_method = decomposition_method
+        self.precision = precision if precision is not None else PrecisionPolicy()
+        self.Ruu_cache = None  # (Ryu, Ruu, Ryu @ inv(Ruu)) from the last factorization
+        self.reset_accumulator()
 
     def select_p(self):
         """
@@ -29,17 +48,26 @@ class SRIMAlgorithm:
         # print(f"Selected p: {p}")
         return p
 
+    def hankel_view(self, data):
+        """
+        Return the block-Hankel matrix of a signal as a sliding-window view
+        Column i holds data[i:i+p] flattened in column-major order, so the view
+        shares memory with the signal instead of copying it p times
+        """
+        data = self.precision.as_data(data)
+        # (N, p) windows for a single channel, (N, channels, p) otherwise
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.p, axis=0)
+        if data.ndim == 1:
+            return windows.T  # Zero-copy (p x N) view
+        # Multi-channel data has no single row stride, so this reshape copies
+        return windows.transpose(1, 2, 0).reshape(-1, windows.shape[0])
+
     def construct_Yp_Up(self):
         """
         Create the output data matrix Yp and input data matrix Up
         """
-        N = self.l - self.p + 1
-        Yp = np.zeros((self.p * self.m, N))
-        Up = np.zeros((self.p * self.r, N))
-
-        for i in range(N):
-            Yp[:, i] = self.Y[i:i+self.p].flatten('F')
-            Up[:, i] = self.U[i:i+self.p].flatten('F')
+        Yp = self.hankel_view(self.Y)
+        Up = self.hankel_view(self.U)
 
         # print(f"Constructed Yp: {Yp}")
         # print(f"Constructed Up: {Up}")
@@ -59,12 +87,81 @@ class SRIMAlgorithm:
         # print(f"Calculated Ruu: {Ruu.shape}")
         return Ryy, Ryu, Ruu
 
+    def calculate_lag_correlation_matrices(self):
+        """
+        Calculate correlation matrices Ryy, Ryu, Ruu from lag correlations of Y and U
+        Gives the same result as calculate_correlation_matrices(*construct_Yp_Up())
+        without forming the Hankel products
+        """
+        N = self.l - self.p + 1
+        engine = CorrelationEngine(self.p, self.precision.data_dtype)
+        Ryy = (1 / N) * engine.block_correlation(self.Y, self.Y)
+        Ryu = (1 / N) * engine.block_correlation(self.Y, self.U)
+        Ruu = (1 / N) * engine.block_correlation(self.U, self.U)
+        return Ryy, Ryu, Ruu
+
+    def reset_accumulator(self):
+        """
+        Clear the correlation sums used by the streaming (block-wise) mode
+        """
+        self.Syy = np.zeros((self.p * self.m, self.p * self.m))
+        self.Syu = np.zeros((self.p * self.m, self.p * self.r))
+        self.Suu = np.zeros((self.p * self.r, self.p * self.r))
+        self.num_windows = 0
+        self.Y_carry = None
+        self.U_carry = None
+
+    def accumulate_block(self, Y_block, U_block):
+        """
+        Add one block of output/input samples to the correlation sums
+        The last p-1 samples are carried over so windows spanning two blocks are counted once
+        """
+        Y_block = self.precision.as_data(Y_block)
+        U_block = self.precision.as_data(U_block)
+        if self.Y_carry is not None:
+            Y_block = np.concatenate((self.Y_carry, Y_block))
+            U_block = np.concatenate((self.U_carry, U_block))
+
+        if len(Y_block) >= self.p:
+            engine = CorrelationEngine(self.p, self.precision.data_dtype)
+            self.Syy += engine.block_correlation(Y_block, Y_block)
+            self.Syu += engine.block_correlation(Y_block, U_block)
+            self.Suu += engine.block_correlation(U_block, U_block)
+            self.num_windows += len(Y_block) - self.p + 1
+            Y_block = Y_block[-(self.p - 1):]
+            U_block = U_block[-(self.p - 1):]
+
+        # Keep a copy so the caller may reuse its buffers
+        self.Y_carry = np.array(Y_block)
+        self.U_carry = np.array(U_block)
+
+    def finalize_accumulation(self):
+        """
+        Identify the system from the accumulated correlation sums
+        """
+        if self.num_windows == 0:
+            raise ValueError("At least p samples must be accumulated before identification.")
+        N = self.num_windows
+        return self.realize_from_correlations(self.Syy / N, self.Syu / N, self.Suu / N)
+
+    def calculate_Ryu_Ruu_inv(self, Ryu, Ruu):
+        """
+        Calculate Ryu @ inv(Ruu) with a Cholesky factorization of Ruu
+        The result is cached, so Rhh and every B/D estimate share one factorization
+        """
+        if self.Ruu_cache is not None and self.Ruu_cache[0] is Ryu and self.Ruu_cache[1] is Ruu:
+            return self.Ruu_cache[2]
+
+        # Ruu is symmetric, so Ryu @ inv(Ruu) = (inv(Ruu) @ Ryu.T).T
+        Ryu_Ruu_inv = LinearSolver(Ruu).solve(Ryu.T).T
+        self.Ruu_cache = (Ryu, Ruu, Ryu_Ruu_inv)
+        return Ryu_Ruu_inv
+
     def calculate_Rhh(self, Ryy, Ryu, Ruu):
         """
         Calculate the correlation matrix Rhh
         """
-        Ruu_inv = np.linalg.pinv(Ruu)  # Use pseudo-inverse in case Ruu is non-invertible
-        Rhh = Ryy - np.dot(np.dot(Ryu, Ruu_inv), Ryu.T)
+        Rhh = Ryy - np.dot(self.calculate_Ryu_Ruu_inv(Ryu, Ruu), Ryu.T)
 
         # print(f"Calculated Rhh: {Rhh.shape}")
         return Rhh
@@ -73,14 +170,10 @@ class SRIMAlgorithm:
         """
         Perform singular value decomposition and create the observation matrix O_p
         """
-        U, S, Vh = np.linalg.svd(Rhh)
-        U_n = U[:, :self.n]  # Extract the part corresponding to the n singular values
-        U_o = U[:, self.n:]
+        U_n, U_o, S = self.decompose_Rhh(Rhh, self.decomposition_method)
         O_p = U_n
         
         '''
-        print(f"U: {U}")
-        print(f"U.shape: {U.shape}")
         print(f"U_n: {U_n}")
         print(f"U_n.shape: {U_n.shape}")
         print(f"U_o: {U_o}")
@@ -91,69 +184,107 @@ class SRIMAlgorithm:
         
         return O_p, U_o
 
+    def decompose_Rhh(self, Rhh, method):
+        """
+        Decompose Rhh with the selected backend
+        Returns the n dominant left singular vectors U_n, an orthonormal basis U_o of
+        their complement, and the singular values that the backend computed
+        (all of them for 'svd'/'eigh', only the leading n otherwise)
+        """
+        n = self.n
+        if method == 'svd':
+            U, S, Vh = np.linalg.svd(Rhh)
+            return U[:, :n], U[:, n:], S
+
+        # Rhh is symmetric PSD, so its eigenvectors are its singular vectors
+        Rhh = (Rhh + Rhh.T) / 2
+        size = Rhh.shape[0]
+        if method == 'eigh':
+            S, U = np.linalg.eigh(Rhh)
+            S, U = S[::-1], U[:, ::-1]  # Descending order, as returned by svd
+            return U[:, :n], U[:, n:], S
+        if method == 'eigh_partial':
+            S, U_n = scipy.linalg.eigh(Rhh, subset_by_index=[size - n, size - 1])
+            S, U_n = S[::-1], U_n[:, ::-1]
+        else:
+            S, U_n = self.randomized_eigh(Rhh)
+
+        return U_n, self.orthogonal_complement(U_n), S
+
+    def randomized_eigh(self, Rhh, oversampling=10, power_iterations=2):
+        """
+        Approximate the n dominant eigenpairs of Rhh with a randomized range finder
+        """
+        rng = np.random.default_rng(0)  # Fixed seed so identification is reproducible
+        size = Rhh.shape[0]
+        k = min(self.n + oversampling, size)
+        Q, _ = np.linalg.qr(Rhh @ rng.standard_normal((size, k)))
+        for _ in range(power_iterations):
+            Q, _ = np.linalg.qr(Rhh @ Q)
+
+        # Rayleigh-Ritz on the captured subspace
+        S, V = np.linalg.eigh(Q.T @ Rhh @ Q)
+        S, V = S[::-1][:self.n], V[:, ::-1][:, :self.n]
+        return S, Q @ V
+
+    def orthogonal_complement(self, U_n):
+        """
+        Return an orthonormal basis of the complement of the columns of U_n
+        Any basis works for B/D estimation because the least-squares solution is
+        invariant to an orthogonal change of basis within each block of U_on and U_oT
+        """
+        Q, _ = np.linalg.qr(U_n, mode='complete')
+        return Q[:, U_n.shape[1]:]
+
+    def compare_decomposition_methods(self, Rhh):
+        """
+        Time every decomposition backend on Rhh and report its accuracy against the full SVD
+        The error is the sine of the largest principal angle between the estimated
+        and the reference n-dimensional subspaces
+        """
+        U_ref, U_ref_o, _ = self.decompose_Rhh(Rhh, 'svd')
+        report = {}
+        for method in self.DECOMPOSITION_METHODS:
+            start = time.perf_counter()
+            U_n, _, _ = self.decompose_Rhh(Rhh, method)
+            elapsed = time.perf_counter() - start
+            subspace_error = np.linalg.norm(U_ref_o.T @ U_n, 2)
+            report[method] = {'time': elapsed, 'subspace_error': subspace_error}
+            print(f"{method:>13}: {elapsed * 1e3:8.3f} ms, subspace error {subspace_error:.3e}")
+        return report
+
     def calculate_A_matrix(self, O_p):
         """
         Calculate the state matrix A
         """
         # print(f"O_p (before A calculation): {O_p.shape}")
-        A = np.dot(np.linalg.pinv(O_p[1:(self.p-1)*self.m, :]), O_p[self.m+1:self.p*self.m, :])
+        A = LinearSolver.least_squares(O_p[1:(self.p-1)*self.m, :], O_p[self.m+1:self.p*self.m, :])
         # print(f"Calculated A matrix: {A.shape}")
         return A
     
     def generate_U_on(self, U_n, U_o):
+        """
+        Assemble U_on, whose block row i is [U_o_i^T, sum_{k>i} U_o_k^T U_n_{k-i-1}]
+        (U_o_k and U_n_k are the k-th m-row blocks of U_o and U_n; the last block row ends in zeros)
+        """
         m = self.m
         p = self.p
-        # Get the dimensions of U_o
+        # Get the dimensions of U_o and U_n
         pm, n_o = U_o.shape
-        # print(f"pm: {pm}, n_o: {n_o}")
+        n = U_n.shape[1]
+        U_o_transposed = U_o.T
 
-        # Get the dimensions of U_n
-        pm_n, n = U_n.shape
-        # print(f"pm_n: {pm_n}, n: {n}")
-        
-        # Empty lists to create the submatrices
-        U_o_blocks = []
-        U_n_blocks = []
-
-        # Generate block matrices from U_o (transpose considered)
-        U_o_transposed = U_o.T  # Transpose
-        # print("U_o Transposed:")
-        # print(U_o_transposed)
-
-        for i in range(p):
-            start_col = i * m
-            end_col = (i + 1) * m
-            U_o_block = U_o_transposed[:, start_col:end_col]
-            U_o_blocks.append(U_o_block)
-            # print(f"U_o_block {i+1}:")
-            # print(U_o_block)
-
-        # Block matrices generated from U_n (using the transposed U_o)
-        for i in range(1, p):
-            start_col = i * m
-            U_n_block = U_o_transposed[:, start_col:pm] @ U_n[0:(p-i)*m, :]
-            U_n_blocks.append(U_n_block)
-            # print(f"U_n_block {i}:")
-            # print(U_n_block)
-
-        # The last block is a zero matrix
-        zero_block = np.zeros((n_o, n))
-        U_n_blocks.append(zero_block)
-        # print(f"Zero block:")
-        # print(zero_block)
-
-        # Construct the final U_on matrix
-        U_on = []
-        for i in range(p):
-            combined_block = np.hstack((U_o_blocks[i], U_n_blocks[i]))
-            U_on.append(combined_block)
-            # print(f"Combined block {i+1}:")
-            # print(combined_block)
-
-        # Vertically stack to generate the final matrix
-        U_on = np.vstack(U_on)
-        # print("Final U_on matrix:")
-        # print(U_on)
+        # Preallocate the final U_on matrix
+        U_on = np.empty((p * n_o, m + n))
+
+        # Left column: the m-column blocks of U_o^T stacked vertically
+        U_on[:, :m] = U_o_transposed.reshape(n_o, p, m).transpose(1, 0, 2).reshape(p * n_o, m)
+
+        # Right column: block row i is U_o^T shifted left by (i+1)*m columns (zero-padded) times U_n,
+        # so all p products form one block-Toeplitz matrix multiplied by U_n in a single matmul
+        U_o_padded = np.hstack((U_o_transposed, np.zeros((n_o, pm))))
+        windows = np.lib.stride_tricks.sliding_window_view(U_o_padded, pm, axis=1)[:, m:(p + 1) * m:m]
+        U_on[:, m:] = windows.transpose(1, 0, 2).reshape(p * n_o, pm) @ U_n
 
         return U_on
 
@@ -163,8 +294,8 @@ class SRIMAlgorithm:
         n_o, pr = U_oR.shape
         p = pr // r  # Calculate the number of blocks
 
-        # Slice the matrix by blocks and stack them vertically
-        U_oT = np.vstack([U_oR[:, i*r:(i+1)*r] for i in range(p)])
+        # Stack the r-column blocks vertically (block i becomes rows i*n_o ... (i+1)*n_o-1)
+        U_oT = U_oR.reshape(n_o, p, r).transpose(1, 0, 2).reshape(p * n_o, r)
         
         return U_oT
 
@@ -173,7 +304,7 @@ class SRIMAlgorithm:
         Calculate the input matrix B and direct transmission matrix D
         """
         # print(f"U_o (before B and D calculation): {U_o.shape}")
-        U_oR = np.dot(np.dot(U_o.T, Ryu), np.linalg.pinv(Ruu))
+        U_oR = np.dot(U_o.T, self.calculate_Ryu_Ruu_inv(Ryu, Ruu))
 
         # print(f"U_oR matrix: {U_oR.shape}")
         # print(f"U_oR content: {U_oR}")
@@ -189,7 +320,7 @@ class SRIMAlgorithm:
         # print(f"U_oT content: {U_oT}")
 
         # Calculate the BD matrix (adjust shapes of O_p and U_oR)
-        BD = np.dot(np.linalg.pinv(U_on), U_oT)  # Adjust U_oR shape
+        BD = LinearSolver.least_squares(U_on, U_oT)  # Adjust U_oR shape
 
         # print(f"BD matrix: {BD.shape}")
         # print(f"BD content: {BD}")
@@ -224,8 +355,49 @@ class SRIMAlgorithm:
         """
         Run the entire SRIM algorithm
         """
-        Yp, Up = self.construct_Yp_Up()
-        Ryy, Ryu, Ruu = self.calculate_correlation_matrices(Yp, Up)
+        Ryy, Ryu, Ruu = self.calculate_lag_correlation_matrices()
+        return self.realize_from_correlations(Ryy, Ryu, Ruu)
+
+    def run_order_sweep(self, orders, correlations=None):
+        """
+        Identify models for every system order in orders from a single decomposition of Rhh
+        p is fixed by the order given at construction, which must be at least max(orders)
+        correlations: Optional (Ryy, Ryu, Ruu); computed from Y and U when omitted
+        Returns a dict mapping each order to (A, B, C, D, residual), where residual is the
+        fraction of the energy of Rhh outside the n dominant singular directions
+        """
+        if max(orders) > self.n:
+            raise ValueError("The sweep cannot exceed the system order used to select p.")
+        if correlations is None:
+            correlations = self.calculate_lag_correlation_matrices()
+        Ryy, Ryu, Ruu = correlations
+
+        Rhh = self.calculate_Rhh(Ryy, Ryu, Ruu)
+        U_max, U_o_max, S = self.decompose_Rhh(Rhh, self.decomposition_method)
+        total_energy = np.trace(Rhh)  # Sum of all singular values of the PSD matrix Rhh
+
+        models = {}
+        max_order = self.n
+        try:
+            for n in orders:
+                # The remaining dominant directions join the complement for lower orders
+                self.n = n
+                O_p = U_max[:, :n]
+                U_o = np.hstack((U_max[:, n:], U_o_max))
+                A = self.calculate_A_matrix(O_p)
+                C = self.calculate_C_matrix(O_p)
+                B, D = self.calculate_B_D_matrices(O_p, U_o, Ryu, Ruu)
+                residual = 1 - np.sum(S[:n]) / total_energy
+                models[n] = (A, B, C, D, residual)
+        finally:
+            self.n = max_order
+
+        return models
+
+    def realize_from_correlations(self, Ryy, Ryu, Ruu):
+        """
+        Extract A, B, C, D from the correlation matrices
+        """
         Rhh = self.calculate_Rhh(Ryy, Ryu, Ruu)
         O_p, U_o = self.singular_value_decomposition(Rhh)
         A = self.calculate_A_matrix(O_p)
@@ -2,9 +2,15 @@ import numpy as np
 import scipy.linalg
 import os
 import csv
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from ClassFiles.PrecisionPolicy import PrecisionPolicy
+from ClassFiles.StateSpaceSimulator import StateSpaceSimulator
+from ClassFiles.EigenDecompositionCache import EigenDecompositionCache
 
 class StateFeedbackController:
-    def __init__(self, n, plant_system, ideal_system, input_signal, test_signal, sampling_rate, F_ini, F_ast):
+    def __init__(self, n, plant_system, ideal_system, input_signal, test_signal, sampling_rate, F_ini, F_ast, precision=None, simulation_backend='block',
+                 executor='serial', max_workers=None):
         self.n = n
         self.m = 1
         self.r = 1
@@ -15,6 +21,17 @@ class StateFeedbackController:
         self.test_signal = test_signal
         self.F_ini = F_ini
         self.F_ast = F_ast
+        # Simulated time series are stored in the data precision; state updates run in float64
+        self.precision = precision if precision is not None else PrecisionPolicy()
+        # Backend of StateSpaceSimulator used by every simulation method ('block', 'modal' or 'loop')
+        self.simulation_backend = simulation_backend
+        # 'serial' or 'process': how accumulate_normal_equations runs the ideal-system simulations
+        if executor not in ('serial', 'process'):
+            raise ValueError(f"Unknown executor: {executor}")
+        self.executor = executor
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        # Eigendecompositions and matrix logarithms shared with the other classes
+        self.eigen_cache = EigenDecompositionCache.shared()
         print(f"Initialized StateFeedbackController class.")
     
     def save_matrices_to_csv(self, A, B, C, D, filename):
@@ -40,7 +57,7 @@ class StateFeedbackController:
     def discrete_to_continuous_zoh(self, A_discrete, B_discrete, C_discrete, D_discrete, filename):
         """Convert discrete-time state-space matrices to continuous-time matrices using zero-order hold."""
         # Calculate the continuous-time A matrix
-        A_cont = scipy.linalg.logm(A_discrete) / self.Ts
+        A_cont = self.eigen_cache.logarithm(A_discrete) / self.Ts
         
         # Calculate the continuous-time B matrix
         A_inv = np.linalg.inv(A_cont)
@@ -58,10 +75,17 @@ class StateFeedbackController:
 
         return A_cont, B_cont, C_cont, D_cont
 
-    def analyze_system_properties(self, A_discrete, B_discrete, C_discrete, filename):
+    def analyze_system_properties(self, A_discrete, B_discrete, C_discrete, filename, tolerance=1e-8):
         """
         Analyze stability, controllability, and observability of the discrete-time system.
         
+        Controllability and observability use the PBH eigenvector test on one eigendecomposition
+        of A (a mode is uncontrollable if its left eigenvector is orthogonal to B, unobservable if
+        C maps its right eigenvector to zero), instead of the rank of the ill-conditioned Krylov
+        matrices [B, AB, ..., A^(n-1) B]. The CSV additionally reports the dimensions of the
+        controllable and observable subspaces (incremental orthonormal Krylov basis) and, for a
+        stable system, measures derived from the controllability and observability Gramians.
+        
         Parameters:
         A_discrete : np.ndarray
             The state matrix of the discrete system.
@@ -69,6 +93,8 @@ class StateFeedbackController:
             The input matrix of the discrete system.
         C_discrete : np.ndarray
             The output matrix of the discrete system.
+        tolerance : float
+            Relative threshold below which a PBH measure or Krylov direction counts as zero.
             
         Returns:
         stable : bool
@@ -78,23 +104,40 @@ class StateFeedbackController:
         observable : bool
             True if the system is observable, False otherwise.
         """
+        A_discrete = np.asarray(A_discrete, dtype=np.float64)
+        B_discrete = np.asarray(B_discrete, dtype=np.float64).reshape(A_discrete.shape[0], -1)
+        C_discrete = np.asarray(C_discrete, dtype=np.float64).reshape(-1, A_discrete.shape[0])
         
-        # Eigenvalue calculation for stability (discrete-time system)
-        eigenvalues = np.linalg.eigvals(A_discrete)
+        # One eigendecomposition serves the stability check and both PBH tests
+        eigenvalues, left_vectors, right_vectors = self.eigen_cache.left_right_eigenvectors(A_discrete)
         stable = np.all(np.abs(eigenvalues) < 1)  # Stability check for discrete systems
         
-        # Controllability matrix calculation
-        n = A_discrete.shape[0]
-        controllability_matrix = np.hstack([np.linalg.matrix_power(A_discrete, i) @ B_discrete for i in range(n)])
-        
-        # Check controllability by matrix rank
-        controllable = np.linalg.matrix_rank(controllability_matrix) == n
+        # PBH measures per mode (0 = uncontrollable / unobservable mode)
+        controllability_measures = self.pbh_measures(A_discrete, B_discrete, eigenvalues, left_vectors.conj().T)
+        observability_measures = self.pbh_measures(A_discrete.T, C_discrete.T, eigenvalues, right_vectors.T)
+        controllable = np.min(controllability_measures) > tolerance
+        observable = np.min(observability_measures) > tolerance
         
-        # Observability matrix calculation
-        observability_matrix = np.vstack([C_discrete @ np.linalg.matrix_power(A_discrete, i) for i in range(n)])
-        
-        # Check observability by matrix rank
-        observable = np.linalg.matrix_rank(observability_matrix) == n
+        # Dimensions of the controllable and observable subspaces
+        n = A_discrete.shape[0]
+        controllable_dimension = self.krylov_subspace_dimension(A_discrete, B_discrete, tolerance)
+        observable_dimension = self.krylov_subspace_dimension(A_discrete.T, C_discrete.T, tolerance)
+        
+        # Gramian-based measures (the infinite-horizon Gramians exist for stable systems only)
+        gramian_rows = []
+        if stable:
+            Wc = scipy.linalg.solve_discrete_lyapunov(A_discrete, B_discrete @ B_discrete.T)
+            Wo = scipy.linalg.solve_discrete_lyapunov(A_discrete.T, C_discrete.T @ C_discrete)
+            hankel_singular_values = np.sqrt(np.abs(np.linalg.eigvals(Wc @ Wo)))
+            with np.errstate(divide='ignore'):
+                gramian_rows = [
+                    ['Controllability Gramian min eigenvalue', np.linalg.eigvalsh((Wc + Wc.T) / 2)[0]],
+                    ['Controllability Gramian condition number', np.linalg.cond(Wc)],
+                    ['Observability Gramian min eigenvalue', np.linalg.eigvalsh((Wo + Wo.T) / 2)[0]],
+                    ['Observability Gramian condition number', np.linalg.cond(Wo)],
+                    ['Max Hankel singular value', np.max(hankel_singular_values)],
+                    ['Min Hankel singular value', np.min(hankel_singular_values)]
+                ]
 
         # Optionally, save results to CSV
         output_dir = './output'
@@ -109,11 +152,58 @@ class StateFeedbackController:
             writer.writerow(['Stable', stable])
             writer.writerow(['Controllable', controllable])
             writer.writerow(['Observable', observable])
+            writer.writerow(['Min PBH controllability measure', np.min(controllability_measures)])
+            writer.writerow(['Min PBH observability measure', np.min(observability_measures)])
+            writer.writerow(['Controllable subspace dimension', f"{controllable_dimension}/{n}"])
+            writer.writerow(['Observable subspace dimension', f"{observable_dimension}/{n}"])
+            writer.writerows(gramian_rows)
         
         print(f"System properties saved to {filepath}")
         
         return stable, controllable, observable
 
+    @staticmethod
+    def pbh_measures(A, B, eigenvalues, left_vectors):
+        """
+        PBH controllability measure of every mode of (A, B): |w_i^H B| / (|w_i| |B|) for the left
+        eigenvector w_i (rows of left_vectors). Call with (A.T, C.T) and the right eigenvectors for
+        observability. For a repeated eigenvalue the eigenvectors are not unique, so the rank test
+        sigma_min([lambda I - A, B]) / |[A, B]| is used for that mode instead.
+        """
+        n = A.shape[0]
+        scale = np.linalg.norm(A, 2) + np.linalg.norm(B, 2)
+        measures = np.linalg.norm(left_vectors @ B, axis=1) / (np.linalg.norm(left_vectors, axis=1) * np.linalg.norm(B, 2))
+        
+        distances = np.abs(eigenvalues[:, np.newaxis] - eigenvalues[np.newaxis, :])
+        np.fill_diagonal(distances, np.inf)
+        repeated = np.min(distances, axis=1) < 1e-8 * max(1.0, np.max(np.abs(eigenvalues)))
+        for i in np.flatnonzero(repeated):
+            pencil = np.hstack((eigenvalues[i] * np.eye(n) - A, B))
+            measures[i] = np.linalg.svd(pencil, compute_uv=False)[-1] / scale
+        return measures
+
+    @staticmethod
+    def krylov_subspace_dimension(A, B, tolerance):
+        """
+        Dimension of the Krylov subspace span{B, AB, A^2 B, ...} (the controllable subspace), built
+        incrementally: each step multiplies only the newest orthonormal directions by A and keeps the
+        part that is not already in the basis, so no powers of A are formed.
+        """
+        n = A.shape[0]
+        basis = np.zeros((n, 0))
+        block = B
+        while block.shape[1] > 0 and basis.shape[1] < n:
+            reference = max(np.linalg.norm(block, 2), np.finfo(float).tiny)
+            for _ in range(2):  # Project twice to keep the basis orthonormal
+                block = block - basis @ (basis.T @ block)
+            directions, singular_values, _ = np.linalg.svd(block, full_matrices=False)
+            new_directions = directions[:, singular_values > tolerance * reference]
+            if new_directions.shape[1] == 0:
+                break
+            basis = np.hstack((basis, new_directions))
+            block = A @ new_directions
+        return basis.shape[1]
+
     def save_gain_to_csv(self, F_discrete):
         """Save state feedback gain to CSV file."""
         output_dir = './output'
@@ -152,7 +242,7 @@ class StateFeedbackController:
         
         # Closed-loop system with state feedback (discrete-time)
         A_cl_discrete = A_discrete - B_discrete @ F_discrete  # Multiplying B_discrete (4, 1) with F_discrete (1, 4)
-        eigenvalues_system_discrete = np.linalg.eigvals(A_cl_discrete)
+        eigenvalues_system_discrete = self.eigen_cache.eigenvalues(A_cl_discrete)
 
         # Check stability for the discrete-time system (all eigenvalues must have magnitudes less than 1)
         system_stable = np.all(np.abs(eigenvalues_system_discrete) < 1)
@@ -207,12 +297,6 @@ class StateFeedbackController:
         # Number of time steps and input length
         num_steps = len(input_signal)
         
-        # Initialize state vector (assuming zero initial state)
-        state_vector = np.zeros(system.A.shape[0])
-        
-        # Initialize output signal array
-        output_signal = np.zeros(num_steps)
-        
         # Add white noise to the input signal
         noisy_input_signal = input_signal + noise_level * np.random.randn(num_steps)
         
@@ -226,17 +310,17 @@ class StateFeedbackController:
         # Apply delay: pad the input signal with zeros at the beginning
         delayed_input_signal = np.concatenate((np.zeros(delay_steps), noisy_input_signal))[:num_steps]
         
-        # Iterate through each time step to compute the state and output
-        for t in range(1, num_steps):
-            # Ensure delayed_input_signal[t] is at least 1D (in case it's a scalar)
-            current_input = np.atleast_1d(delayed_input_signal[t-1])
-            
-            # Compute the output at the current time step
-            output_signal[t] = system.C @ state_vector + system.D @ current_input
-            
-            # Update the state vector for the next time step
-            state_vector = system.A @ state_vector + system.B @ current_input
-        
+        # Output at step t uses the input of step t-1
+        return self.simulate_output_one_step_delayed(system, delayed_input_signal)
+
+    def simulate_output_one_step_delayed(self, system, input_signal):
+        """
+        Simulate y[t] = C x[t-1] + D u[t-1] with x[t] = A x[t-1] + B u[t-1], y[0] = 0 and a zero
+        initial state, which is the time convention of the simulate_* methods of this class.
+        """
+        output_signal = np.zeros(len(input_signal), dtype=self.precision.data_dtype)
+        simulator = StateSpaceSimulator.for_system(system, backend=self.simulation_backend)
+        output_signal[1:] = simulator.simulate_output(input_signal[:-1])
         return output_signal
     
     def simulate_without_delay_and_noise(self, system, input_signal):
@@ -250,15 +334,6 @@ class StateFeedbackController:
         Returns:
         np.ndarray: Output time series signal.
         """
-        # Number of time steps and input length
-        num_steps = len(input_signal)
-        
-        # Initialize state vector (assuming zero initial state)
-        state_vector = np.zeros(system.A.shape[0])
-        
-        # Initialize output signal array
-        output_signal = np.zeros(num_steps)
-        
         # Scale input signal to range [-1, 1]
         """
         min_val = np.min(input_signal)
@@ -266,19 +341,8 @@ class StateFeedbackController:
         scaled_input_signal = 2 * (input_signal - min_val) / (max_val - min_val) - 1
         """
         
-        # Iterate through each time step to compute the state and output
-        for t in range(1, num_steps):
-            # Ensure scaled_input_signal[t] is at least 1D (in case it's a scalar)
-            # current_input = np.atleast_1d(scaled_input_signal[t])
-            current_input = np.atleast_1d(input_signal[t-1])
-            
-            # Compute the output at the current time step
-            output_signal[t] = system.C @ state_vector + system.D @ current_input
-            
-            # Update the state vector for the next time step
-            state_vector = system.A @ state_vector + system.B @ current_input
-        
-        return output_signal
+        # Output at step t uses the input of step t-1
+        return self.simulate_output_one_step_delayed(system, input_signal)
     
     def generate_state_time_series(self, system, input_signal):
         """
@@ -290,98 +354,231 @@ class StateFeedbackController:
         Returns:
         np.ndarray: Time series of state vectors.
         """
-        # Number of time steps and input length
-        num_steps = len(input_signal)
-        
-        # Initialize state vector (assuming zero initial state)
-        state_vector = np.zeros(system.A.shape[0])
-        
-        # Initialize time series for state vectors
-        state_time_series = np.zeros((num_steps, system.A.shape[0]))
-        
-        # Iterate through each time step to compute the state
-        for t in range(1, num_steps):
-            # Ensure input_signal[t] is at least 1D (in case it's a scalar)
-            current_input =  np.atleast_1d(input_signal[t-1])
-            
-            # Update the state vector for the next time step
-            state_vector = system.A @ state_vector + system.B @ current_input
-            
-            # Store the current state vector in the time series
-            state_time_series[t, :] = state_vector.T
+        # State at step t is driven by the inputs up to step t-1 (zero initial state)
+        simulator = StateSpaceSimulator.for_system(system, backend=self.simulation_backend)
+        state_time_series = simulator.simulate_states(input_signal, dtype=self.precision.data_dtype)
         
         # print('state_time_series: ', state_time_series)
         
         return state_time_series
     
-    def calculate_Gamma(self, control_input_signal, state_time_series):
-        """
-        Calculate the Gamma array, which represents the difference between the plant's state 
-        and the ideal system's state over time.
-        
-        Parameters:
-        - control_input_signal: The input signal for the control system, used to generate the state 
-        time series of the ideal system.
-        - state_time_series: A 2D array representing the state time series of the plant.
-        
-        Returns:
-        - Gamma: A 1D array that contains the differences between the plant's state and the 
-        ideal system's state over time, for each state variable in the system.
+    def accumulate_normal_equations(self, F):
         """
-        # Number of state variables (n) and time steps (N)
-        n = self.n  # Number of state variables
-        N = len(self.input_signal)  # Number of time steps
-
-        # Initialize the Gamma array to store the state differences
-        Gamma = np.zeros((n * N, 1))
-        gamma = np.zeros((N, 1))
-
-        # Generate the state time series for the ideal system
-        generated_state_series = self.generate_state_time_series(self.ideal_system, control_input_signal)
-        
-        # Loop over each state variable (j represents the index of the state variable)
-        for j in range(n):
-            # Calculate the difference for the current state variable across all time steps
-            gamma = state_time_series[:, j] - generated_state_series[:, j]
-
-            # Store the result in the appropriate section of the Gamma array
-            Gamma[j * N:(j+1) * N, 0] = gamma
-            
-        # Print the resulting Gamma array
-        # print('Calculated Gamma matrix:', Gamma)
-        
-        return Gamma
-    
-    def generate_W(self, state_time_series):
-        """
-        Generate the W matrix based on system responses.
+        Accumulate W^T W and Gamma^T W of compute_feedback_gain without materializing W (n*N x n)
+        or Gamma (n*N x 1). The ideal system is driven by the n plant states under state feedback F
+        (the columns of W) and by the control input (for Gamma) as one matrix-valued state.
+        With executor='serial' the plant and the ideal system are simulated together, one time chunk
+        at a time, so memory use depends on the chunk length only. With executor='process' see
+        accumulate_normal_equations_parallel.
 
         Parameters:
-        state_time_series (np.ndarray): Time series data of system states (shape: N x n, where N is the number of time steps and n is the number of states).
+        F (np.ndarray): State feedback gain used for the plant simulation (1 x n).
 
         Returns:
-        np.ndarray: The W matrix of system responses (shape: n*N x n).
+        tuple: W^T W (n x n) and Gamma^T W (1 x n), both in float64.
         """
-        # Number of systems (n) and time steps (N)
-        n = self.n  # Number of state variables
-        N = len(self.input_signal)  # Number of time steps
-
-        # Initialize the W matrix of size (n * N) x n
-        W = np.zeros((n * N, n))
+        if self.executor == 'process':
+            return self.accumulate_normal_equations_parallel(F)
+
+        n = self.n
+        N = len(self.input_signal)
+        plant, F = self.closed_loop_simulator(F)
+        ideal = StateSpaceSimulator.for_system(self.ideal_system, backend=self.simulation_backend)
+        chunk_size = ideal.batch_chunk_size(n + 1)
+
+        plant_state = np.zeros(n)
+        ideal_state = np.zeros((n, n + 1))
+        WtW = np.zeros((n, n))
+        GammatW = np.zeros((1, n))
+
+        for start in range(0, N, chunk_size):
+            stop = min(start + chunk_size, N)
+            plant_inputs, plant_state = self.simulate_plant_chunk(
+                plant, F, self.input_signal, start, stop, plant_state, self.precision.data_dtype)
+            WtW_part, GammatW_part, ideal_state = self.accumulate_chunk(
+                ideal, plant_inputs, ideal_state, self.precision.data_dtype)
+            WtW += WtW_part
+            GammatW += GammatW_part
+
+        return WtW, GammatW
+
+    def closed_loop_simulator(self, F):
+        """
+        Return a simulator of the plant under state feedback (the closed loop of
+        simulate_with_state_feedback) and F as a (1 x n) float64 row.
+        """
+        F = np.asarray(F, dtype=np.float64).reshape(1, -1)
+        plant = StateSpaceSimulator(self.plant_system.A - self.plant_system.B @ F, self.plant_system.B,
+                                    backend=self.simulation_backend)
+        return plant, F
 
-        # Loop over each state variable to compute the W matrix
-        for i in range(n):
-            # Generate the state time series for the ideal system based on the input state
-            generated_state_series = self.generate_state_time_series(self.ideal_system, state_time_series[:, i])
-            for j in range(n):
-                # Store the generated state series for the j-th state
-                W[j * N:(j + 1) * N, i] = generated_state_series[:, j]
+    @staticmethod
+    def simulate_plant_chunk(plant, F, input_signal, start, stop, plant_state, data_dtype):
+        """
+        Simulate samples start ... stop-1 of the plant under state feedback and return the inputs of
+        the ideal system for this chunk, [plant states, control input] (shape (L, n+1)), rounded to
+        the data precision as the stored time series would be, and the plant state after the chunk.
+        """
+        chunk = np.asarray(input_signal[start:stop], dtype=np.float64)
+        plant_states, plant_state = plant.simulate_states_chunk(chunk[:, np.newaxis], plant_state)
+        plant_states = plant_states.astype(data_dtype).astype(np.float64)
+
+        control_input = chunk - plant_states @ F[0]
+        if stop == len(input_signal):
+            control_input[-1] = 0  # The last control input is never applied
+        plant_inputs = np.column_stack((plant_states, control_input))
+        return plant_inputs.astype(data_dtype).astype(np.float64), plant_state
+
+    @staticmethod
+    def accumulate_chunk(ideal, plant_inputs, ideal_state, data_dtype):
+        """
+        Simulate the ideal system for one chunk of [plant states, control input] and return this
+        chunk's contributions to W^T W and Gamma^T W together with the ideal state after the chunk.
+        Rows of the chunk: W[j * N + t, i] = x_j(t) driven by plant state i, Gamma[j * N + t] = gamma_j(t).
+        """
+        n = plant_inputs.shape[1] - 1
+        ideal_states, ideal_state = ideal.simulate_chunk_batch(plant_inputs, ideal_state)
+        ideal_states = ideal_states.astype(data_dtype).astype(np.float64)
 
-            print('i: ', i)
+        W_chunk = ideal_states[:, :, :n]
+        gamma = plant_inputs[:, :n] - ideal_states[:, :, n]
+        WtW = np.tensordot(W_chunk, W_chunk, axes=([0, 1], [0, 1]))
+        GammatW = np.tensordot(gamma, W_chunk, axes=([0, 1], [0, 1]))[np.newaxis]
+        return WtW, GammatW, ideal_state
 
-        # print('Calculated W matrix: ', W)
+    def accumulate_normal_equations_parallel(self, F):
+        """
+        Process-pool version of accumulate_normal_equations. Only the input signal (N samples) is
+        placed in shared memory; the time axis is split into one segment per worker, and every worker
+        simulates the plant and the ideal system of its segment chunk by chunk, so memory use stays
+        bounded as in the serial version. The segment start states are found in parallel passes:
+        1. every worker computes the plant state at the end of its segment from a zero start
+           (StateSpaceSimulator.final_state_batch), and a short sequential pass over the segment
+           boundaries turns these into the true plant start states,
+        2. every worker simulates the plant of its segment and computes the ideal state at the end of
+           the segment from a zero start; the ideal start states follow the same way,
+        3. every worker simulates its segment from both start states and accumulates its partial sums.
+        The partial sums are added in segment order, so the result does not depend on which worker
+        finishes first.
+        """
+        n = self.n
+        N = len(self.input_signal)
+        plant, F = self.closed_loop_simulator(F)
+        systems = (plant.A, plant.B, F, np.asarray(self.ideal_system.A, dtype=np.float64),
+                   np.asarray(self.ideal_system.B, dtype=np.float64), self.simulation_backend, self.precision.data_dtype.str)
+
+        shared = shared_memory.SharedMemory(create=True, size=N * np.dtype(np.float64).itemsize)
+        try:
+            input_signal = np.ndarray(N, dtype=np.float64, buffer=shared.buf)
+            input_signal[:] = self.input_signal
+
+            num_segments = max(1, min(self.max_workers, N))
+            bounds = np.linspace(0, N, num_segments + 1).astype(int)
+            segments = [(bounds[c], bounds[c + 1]) for c in range(num_segments)]
+            arguments = [(shared.name, N, systems) + segment for segment in segments]
+
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                end_states = pool.map(StateFeedbackController.plant_segment_end_state, *zip(*arguments))
+                plant_start_states = self.chain_segment_states(plant.A, segments, list(end_states), np.zeros((n, 1)))
+
+                end_states = pool.map(StateFeedbackController.ideal_segment_end_state,
+                                      *zip(*[argument + (plant_start_state,)
+                                             for argument, plant_start_state in zip(arguments, plant_start_states)]))
+                ideal_start_states = self.chain_segment_states(systems[3], segments, list(end_states), np.zeros((n, n + 1)))
+
+                partial_sums = list(pool.map(StateFeedbackController.accumulate_segment,
+                                             *zip(*[argument + start_states for argument, start_states
+                                                    in zip(arguments, zip(plant_start_states, ideal_start_states))])))
+        finally:
+            shared.close()
+            shared.unlink()
+
+        WtW = np.zeros((n, n))
+        GammatW = np.zeros((1, n))
+        for WtW_part, GammatW_part in partial_sums:
+            WtW += WtW_part
+            GammatW += GammatW_part
+        return WtW, GammatW
+
+    @staticmethod
+    def chain_segment_states(A, segments, end_states, initial_state):
+        """
+        Sequential pass over the segment boundaries: the state at the start of segment c + 1 is
+        A^L times the start state of segment c (L samples) plus its end state from a zero start.
+        """
+        start_states = [initial_state]
+        for (start, stop), end_state in zip(segments[:-1], end_states[:-1]):
+            start_states.append(np.linalg.matrix_power(A, stop - start) @ start_states[-1] + end_state)
+        return start_states
 
-        return W
+    @staticmethod
+    def segment_plant_inputs(shared_name, N, systems, start, stop, plant_state, chunk_size):
+        """
+        Generator used by the workers of accumulate_normal_equations_parallel: simulate the plant of
+        samples start ... stop-1 from plant_state (the input signal is read from shared memory) and
+        yield the inputs of the ideal system chunk by chunk.
+        """
+        plant_A, plant_B, F, _, _, backend, dtype = systems
+        shared = shared_memory.SharedMemory(name=shared_name)
+        input_signal = np.ndarray(N, dtype=np.float64, buffer=shared.buf)
+        try:
+            plant = StateSpaceSimulator(plant_A, plant_B, backend=backend)
+            plant_state = plant_state[:, 0]
+            for chunk_start in range(start, stop, chunk_size):
+                chunk_stop = min(chunk_start + chunk_size, stop)
+                plant_inputs, plant_state = StateFeedbackController.simulate_plant_chunk(
+                    plant, F, input_signal, chunk_start, chunk_stop, plant_state, np.dtype(dtype))
+                yield plant_inputs
+        finally:
+            del input_signal  # Release the buffer before closing the shared memory
+            shared.close()
+
+    @staticmethod
+    def plant_segment_end_state(shared_name, N, systems, start, stop):
+        """
+        Worker of accumulate_normal_equations_parallel (pass 1): plant state after the inputs of
+        samples start ... stop-1, starting from a zero state.
+        """
+        shared = shared_memory.SharedMemory(name=shared_name)
+        input_signal = np.ndarray(N, dtype=np.float64, buffer=shared.buf)
+        try:
+            plant = StateSpaceSimulator(systems[0], systems[1], backend=systems[5])
+            return plant.final_state_batch(input_signal[start:stop, np.newaxis].copy())
+        finally:
+            del input_signal  # Release the buffer before closing the shared memory
+            shared.close()
+
+    @staticmethod
+    def ideal_segment_end_state(shared_name, N, systems, start, stop, plant_start_state):
+        """
+        Worker of accumulate_normal_equations_parallel (pass 2): ideal state after samples
+        start ... stop-1, starting from a zero state, with the plant simulated from plant_start_state.
+        """
+        ideal = StateSpaceSimulator(systems[3], systems[4], backend=systems[5])
+        ideal_state = None
+        for plant_inputs in StateFeedbackController.segment_plant_inputs(
+                shared_name, N, systems, start, stop, plant_start_state, ideal.batch_chunk_size(1)):
+            ideal_state = ideal.final_state_batch(plant_inputs, ideal_state)
+        return ideal_state
+
+    @staticmethod
+    def accumulate_segment(shared_name, N, systems, start, stop, plant_start_state, ideal_start_state):
+        """
+        Worker of accumulate_normal_equations_parallel (pass 3): partial W^T W and Gamma^T W of
+        samples start ... stop-1, simulated from the given plant and ideal states.
+        """
+        n = ideal_start_state.shape[0]
+        ideal = StateSpaceSimulator(systems[3], systems[4], backend=systems[5])
+        WtW = np.zeros((n, n))
+        GammatW = np.zeros((1, n))
+        ideal_state = ideal_start_state
+        for plant_inputs in StateFeedbackController.segment_plant_inputs(
+                shared_name, N, systems, start, stop, plant_start_state, ideal.batch_chunk_size(n + 1)):
+            WtW_part, GammatW_part, ideal_state = StateFeedbackController.accumulate_chunk(
+                ideal, plant_inputs, ideal_state, np.dtype(systems[6]))
+            WtW += WtW_part
+            GammatW += GammatW_part
+        return WtW, GammatW
 
     def compute_feedback_gain(self):
         """
@@ -390,33 +587,16 @@ class StateFeedbackController:
 
         This function calculates the feedback gain matrix by comparing the state time series from 
         the plant system with the ideal system and performing matrix operations to derive the 
-        feedback gain. The process involves generating time series data, calculating the Gamma 
-        matrix and the W matrix, and computing the inverse of (W^T W) to obtain the feedback gain.
+        feedback gain. The process involves simulating both systems, accumulating W^T W and Gamma^T W
+        (see accumulate_normal_equations), and computing the inverse of (W^T W) to obtain the feedback gain.
 
         Returns:
         F (np.ndarray): The feedback gain matrix.
         """
         
-        # Generate the state time series for the plant system
-        print("Generating state time series for the plant system...")
-        _, control_input_signal, state_time_series = self.simulate_with_state_feedback(
-            self.plant_system, self.input_signal, self.F_ini)
-
-        # Generate the state time series for the ideal system and calculate the Gamma matrix
-        print("Generating the state time series for the ideal system and calculating the Gamma matrix...")
-        Gamma = self.calculate_Gamma(control_input_signal, state_time_series)
-
-        # Compute W matrix using the state time series from the plant system
-        print("Computing W matrix...")
-        W = self.generate_W(state_time_series)
-
-        # Compute the transpose of W
-        print("Computing the transpose of W...")
-        Wt = W.T  # Transpose of W
-
-        # Compute W^T W
-        print("Computing W^T W...")
-        WtW = Wt @ W  # W^T W
+        # Accumulate W^T W and Gamma^T W chunk by chunk without storing W or Gamma
+        print("Accumulating W^T W and Gamma^T W from the plant and ideal system simulations...")
+        WtW, GammatW = self.accumulate_normal_equations(self.F_ini)
 
         # Compute the pseudo-inverse of W^T W for better stability
         print("Computing the pseudo-inverse of W^T W...")
@@ -424,7 +604,7 @@ class StateFeedbackController:
 
         # Compute the feedback gain matrix F
         print("Computing the feedback gain matrix F using the pseudo-inverse of W^T W...")
-        F = Gamma.T @ W @ WtW_inv  # The feedback gain matrix
+        F = GammatW @ WtW_inv  # The feedback gain matrix
 
         # Save the computed feedback gain to a CSV file
         self.save_gain_to_csv(F)
@@ -448,41 +628,27 @@ class StateFeedbackController:
         """
         # Number of time steps and input length
         num_steps = len(input_signal)
+        F = np.asarray(F, dtype=np.float64).reshape(1, -1)
         
-        # Initialize state vector (assuming zero initial state)
-        state_vector = np.zeros(system.A.shape[0])
-
-        # Initialize time series for state vectors
-        state_time_series = np.zeros((num_steps, system.A.shape[0]))
+        # With u[t] = input[t] - F x[t] the closed loop is x[t+1] = (A - B F) x[t] + B input[t]
+        simulator = StateSpaceSimulator(system.A - system.B @ F, system.B, backend=self.simulation_backend)
+        state_time_series = simulator.simulate_states(input_signal, dtype=self.precision.data_dtype)
         
         # Initialize output signal and control input signal arrays
-        output_signal = np.zeros(num_steps)
-        control_input_signal = np.zeros(num_steps)
+        output_signal = np.zeros(num_steps, dtype=self.precision.data_dtype)
+        control_input_signal = np.zeros(num_steps, dtype=self.precision.data_dtype)
         
-        # Iterate through each time step to compute the state, control input, and output
-        for t in range(1, num_steps):
-            # Compute the control input using state feedback
-            control_input = np.atleast_1d(input_signal[t-1] - F @ state_vector)
-            
-            # Check for numerical overflow and clamp values if needed
-            # control_input = np.clip(control_input, -max_value, max_value)
-            
-            # Store the control input signal
-            control_input_signal[t-1] = control_input
+        # Control input applied at steps 0 ... N-2 (the last step is never applied)
+        control_input_signal[:-1] = input_signal[:-1] - state_time_series[:-1] @ F[0]
             
-            # Compute the output at the current time step
-            output_signal[t] = system.C @ state_vector + system.D @ control_input
-            
-            # Update the state vector for the next time step
-            state_vector = system.A @ state_vector + system.B @ control_input
+        # Check for numerical overflow and clamp values if needed
+        # control_input = np.clip(control_input, -max_value, max_value)
+        
+        # Output at step t uses the state and control input of step t-1
+        output_signal[1:] = (state_time_series[:-1] @ system.C.T)[:, 0] + control_input_signal[:-1] * system.D[0, 0]
             
-            # Prevent state vector from exploding due to numerical instability
-            # state_vector = np.clip(state_vector, -max_value, max_value)
-
-            # Store the current state vector in the time series
-            state_time_series[t, :] = state_vector.T
-
-            # print('control_input: ', control_input)
+        # Prevent state vector from exploding due to numerical instability
+        # state_vector = np.clip(state_vector, -max_value, max_value)
 
         # print('state_time_series: ', state_time_series)
 
@@ -1,11 +1,22 @@
+import threading
+from collections import OrderedDict
 import numpy as np
-import scipy.linalg
+from scipy.optimize import brentq
+from ClassFiles.EigenDecompositionCache import EigenDecompositionCache
+from ClassFiles.RootLocusTracker import RootLocusTracker
+from ClassFiles.ClosedLoopAnalysis import ClosedLoopAnalysis
 
 class StateSpaceModel:
-    def __init__(self, system_matrix, input_matrix, output_matrix, feedthrough_matrix, gain=1.0, sampling_period=44.1e3):
+    def __init__(self, system_matrix, input_matrix, output_matrix, feedthrough_matrix, gain=1.0, sampling_period=44.1e3,
+                 use_matrix_logarithm=False, use_root_tracking=True, max_cached_analyses=64):
         """
         Initialize the state-space model with system matrix A, input matrix B, 
         output matrix C, feedthrough matrix D, gain, and sampling period.
+        use_matrix_logarithm: If True, calculate_eigenvalues takes the eigenvalues of logm(A_cl) / dt
+        instead of mapping the discrete eigenvalues directly (log(eig(A_cl)) / dt).
+        use_root_tracking: If True, the discrete closed-loop eigenvalues are tracked from the previous
+        gain with RootLocusTracker instead of solving the eigenproblem of A_cl for every gain.
+        max_cached_analyses: Number of gains whose closed-loop analysis is kept (least recently used evicted first).
         """
         self.system_matrix = system_matrix  # A matrix
         self.input_matrix = input_matrix  # B matrix
@@ -13,6 +24,15 @@ class StateSpaceModel:
         self.feedthrough_matrix = feedthrough_matrix  # D matrix
         self.gain = gain  # Gain for output feedback
         self.sampling_period = sampling_period  # Sampling period
+        self.use_matrix_logarithm = use_matrix_logarithm  # Eigenvalues via the continuous matrix (slow path)
+        self.use_root_tracking = use_root_tracking  # Track closed-loop poles across gain changes
+        self.root_locus_tracker = None  # Created on first use (needs the eigendecomposition of A)
+        self.tracker_lock = threading.Lock()  # The tracker keeps state; eigenvalues may be computed off the Tk thread
+        self.eigen_cache = EigenDecompositionCache.shared()  # Decompositions shared with the other classes
+        self.max_cached_analyses = max_cached_analyses
+        self.analyses = OrderedDict()  # ClosedLoopAnalysis per gain
+        self.analysis_lock = threading.Lock()
+        self.critical_gain_results = {}  # critical_gains() per grid size (depends on A, B, C, D only)
 
     def update_gain(self, new_gain):
         """
@@ -20,37 +40,189 @@ class StateSpaceModel:
         """
         self.gain = new_gain
 
-    def get_discrete_A_cl(self):
+    def get_discrete_A_cl(self, gain=None):
         """
         Calculate the discrete-time closed-loop system matrix for output feedback (A - gain * B * C / (1 + gain * D)).
+        The methods taking a gain argument use the current gain when it is None.
         """
-        denominator = 1 + self.gain * self.feedthrough_matrix
+        gain = self.gain if gain is None else gain
+        denominator = 1 + gain * self.feedthrough_matrix
         if denominator == 0:
             raise ValueError("The denominator 1 + gain * D cannot be zero for stability.")
         
         # A - (gain * B * C) / (1 + gain * D)
-        A_cl = self.system_matrix - (self.gain * self.input_matrix @ self.output_matrix) / denominator
+        A_cl = self.system_matrix - (gain * self.input_matrix @ self.output_matrix) / denominator
         return A_cl
 
-    def get_continuous_A_cl(self):
+    def get_feedback_factor(self, gain=None):
+        """
+        Calculate kappa = gain / (1 + gain * D), so that A_cl = A - kappa * B * C.
+        """
+        gain = self.gain if gain is None else gain
+        denominator = 1 + gain * self.feedthrough_matrix
+        if np.any(denominator == 0):
+            raise ValueError("The denominator 1 + gain * D cannot be zero for stability.")
+        return float(np.squeeze(gain / denominator))
+
+    def calculate_discrete_eigenvalues(self, gain=None):
+        """
+        Calculate the eigenvalues of the discrete-time closed-loop matrix A_cl.
+        """
+        if not self.use_root_tracking:
+            return self.eigen_cache.eigenvalues(self.get_discrete_A_cl(gain))
+
+        with self.tracker_lock:
+            return self.get_root_locus_tracker().poles(self.get_feedback_factor(gain))
+
+    def get_root_locus_tracker(self):
+        """
+        Return the root-locus tracker of the open loop, creating it on first use.
+        """
+        if self.root_locus_tracker is None:
+            self.root_locus_tracker = RootLocusTracker(self.system_matrix, self.input_matrix, self.output_matrix)
+        return self.root_locus_tracker
+
+    def get_continuous_A_cl(self, gain=None):
         """
         Convert the discrete-time matrix A_cl to a continuous-time matrix.
         """
-        discrete_A_cl = self.get_discrete_A_cl()
+        discrete_A_cl = self.get_discrete_A_cl(gain)
         dt = self.calculate_control_period(self.sampling_period)
 
         # Calculate the continuous-time matrix using the matrix logarithm
-        continuous_A_cl = scipy.linalg.logm(discrete_A_cl) / dt
+        continuous_A_cl = self.eigen_cache.logarithm(discrete_A_cl) / dt
         return continuous_A_cl
 
-    def calculate_eigenvalues(self):
+    def calculate_eigenvalues(self, gain=None):
         """
         Calculate the eigenvalues of the continuous-time closed-loop matrix A_cl.
+        The eigenvalues of logm(A_cl) / dt are log(lambda) / dt for the eigenvalues lambda of the
+        discrete A_cl (principal branch, as logm), so by default only the discrete eigenvalues are
+        computed; the matrix logarithm is formed only if use_matrix_logarithm is set.
         """
-        continuous_A_cl = self.get_continuous_A_cl()
-        eigenvalues = np.linalg.eigvals(continuous_A_cl)
+        if self.use_matrix_logarithm:
+            continuous_A_cl = self.get_continuous_A_cl(gain)
+            return self.eigen_cache.eigenvalues(continuous_A_cl)
+
+        dt = self.calculate_control_period(self.sampling_period)
+        eigenvalues = np.log(self.calculate_discrete_eigenvalues(gain).astype(complex)) / dt
         return eigenvalues
 
+    def analyze_closed_loop(self, gain=None):
+        """
+        Return the ClosedLoopAnalysis (eigenvalues, spectral radius, stability, dominant mode) of a gain.
+        Results are memoized per gain, so repeated gains (slider wiggling, invert toggling) and
+        several consumers of the same gain cost one eigenvalue computation.
+        """
+        gain = self.gain if gain is None else gain
+        key = (float(gain), self.use_matrix_logarithm)
+        with self.analysis_lock:
+            analysis = self.analyses.get(key)
+            if analysis is not None:
+                self.analyses.move_to_end(key)
+                return analysis
+
+        dt = self.calculate_control_period(self.sampling_period)
+        analysis = ClosedLoopAnalysis(gain, self.calculate_eigenvalues(gain), dt)
+        with self.analysis_lock:
+            self.analyses[key] = analysis
+            if len(self.analyses) > self.max_cached_analyses:
+                self.analyses.popitem(last=False)
+        return analysis
+
+    def cached_analysis(self, gain=None):
+        """
+        Return the memoized ClosedLoopAnalysis of a gain, or None if it has not been computed yet.
+        """
+        gain = self.gain if gain is None else gain
+        with self.analysis_lock:
+            return self.analyses.get((float(gain), self.use_matrix_logarithm))
+
+    def open_loop_response(self, omega):
+        """
+        Calculate G0(e^{j omega}) = C (e^{j omega} I - A)^-1 B for normalized angular frequencies omega
+        (rad/sample), from the partial fractions sum_i r_i / (z - lambda_i) of the root-locus tracker,
+        or by direct solves if the eigendecomposition of A is ill-conditioned.
+        """
+        with self.tracker_lock:
+            tracker = self.get_root_locus_tracker()
+        z = np.exp(1j * np.atleast_1d(np.asarray(omega, dtype=np.float64)))
+
+        if tracker.enabled:
+            return (1.0 / (z[:, np.newaxis] - tracker.open_loop_poles[np.newaxis, :])) @ tracker.residues
+
+        n = tracker.A.shape[0]
+        resolvent = z[:, np.newaxis, np.newaxis] * np.eye(n) - tracker.A
+        return (tracker.C @ np.linalg.solve(resolvent, np.broadcast_to(tracker.B, (len(z), n, 1))))[:, 0, 0]
+
+    def critical_gains(self, num_points=8192):
+        """
+        Calculate every output-feedback gain at which a closed-loop pole lies on the unit circle
+        (the loop starts or stops howling there), for both signs of the gain.
+        A pole at z = e^{j omega} solves 1 + kappa G0(z) = 0 with real kappa = gain / (1 + gain * D),
+        so the crossings are the frequencies where Im G0(e^{j omega}) = 0, located on a frequency grid
+        (refined around every open-loop pole) and solved with brentq; then kappa = -1 / G0 and
+        gain = kappa / (1 - kappa * D).
+
+        The result is memoized, as it does not depend on the current gain.
+
+        Returns:
+        list of (gain, frequency_hz) sorted by |gain|; frequency_hz is the howling frequency.
+        """
+        if num_points in self.critical_gain_results:
+            return list(self.critical_gain_results[num_points])
+
+        with self.tracker_lock:
+            poles = self.get_root_locus_tracker().open_loop_poles
+
+        # Uniform grid plus points around every lightly damped resonance
+        angles = np.abs(np.angle(poles))
+        widths = np.maximum(np.abs(1 - np.abs(poles)), 1e-9)
+        offsets = np.array([-4, -2, -1, -0.5, 0, 0.5, 1, 2, 4])
+        omega = np.concatenate((np.linspace(0, np.pi, num_points), (angles[:, np.newaxis] + offsets * widths[:, np.newaxis]).ravel()))
+        omega = np.unique(np.clip(omega, 0, np.pi))
+
+        def imaginary_part(w):
+            return self.open_loop_response(w)[0].imag
+
+        response = self.open_loop_response(omega)
+        crossings = [0.0, np.pi]  # G0 is real at z = 1 and z = -1
+        sign_change = np.flatnonzero(np.sign(response.imag[:-1]) * np.sign(response.imag[1:]) < 0)
+        for k in sign_change:
+            # A sign change across a pole on the circle is not a root
+            if np.all(np.isfinite(response[k:k + 2])):
+                crossings.append(brentq(imaginary_part, omega[k], omega[k + 1], xtol=1e-14))
+        crossings = np.sort(crossings)
+        crossings = crossings[np.concatenate(([True], np.diff(crossings) > 1e-12))]  # A root at a grid point is found from both sides
+
+        D = float(np.squeeze(self.feedthrough_matrix))
+        fs = self.sampling_period  # Holds the sampling frequency in Hz (see calculate_control_period)
+        results = []
+        for w in crossings:
+            G0 = self.open_loop_response(w)[0]
+            if not np.isfinite(G0) or G0 == 0:
+                continue
+            kappa = -1.0 / G0.real
+            if 1 - kappa * D == 0:
+                continue
+            results.append((kappa / (1 - kappa * D), w * fs / (2 * np.pi)))
+        self.critical_gain_results[num_points] = sorted(results, key=lambda result: abs(result[0]))
+        return list(self.critical_gain_results[num_points])
+
+    def howling_margin(self, gain=None):
+        """
+        Return the smallest critical gain of the sign of the given (or current) gain, its howling
+        frequency in Hz, and the margin in dB from the gain to it (negative once it is exceeded).
+        Assumes a stable open loop, so the smallest critical gain is where howling starts.
+        Returns None if no critical gain of that sign exists.
+        """
+        gain = self.gain if gain is None else gain
+        same_sign = [(g, f) for g, f in self.critical_gains() if np.sign(g) == np.sign(gain)]
+        if not same_sign or gain == 0:
+            return None
+        critical_gain, frequency = same_sign[0]
+        return critical_gain, frequency, 20 * np.log10(abs(critical_gain) / abs(gain))
+
     def calculate_control_period(self, sampling_frequency):
         """
         Calculate the control period (sampling period) from the sampling frequency (in Hz).
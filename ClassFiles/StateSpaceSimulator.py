@@ -0,0 +1,277 @@
+import numpy as np
+import scipy.signal
+from ClassFiles.EigenDecompositionCache import EigenDecompositionCache
+
+class StateSpaceSimulator:
+    BACKENDS = ('block', 'modal', 'loop')
+
+    def __init__(self, A, B, C=None, D=None, backend='block', block_size=64, chunk_size=16384, max_modal_condition=1e8):
+        """
+        Simulate the discrete-time system x[t+1] = A x[t] + B u[t], y[t] = C x[t] + D u[t]
+        backend: 'block' processes block_size samples per matrix product (default),
+                 'modal' runs the diagonalized system as a bank of first-order IIR filters,
+                 'loop' steps one sample at a time (reference implementation)
+        block_size: Number of samples advanced by one product in the block backend
+        chunk_size: Number of samples processed per pass (bounds the temporary memory)
+        max_modal_condition: Largest condition number of the eigenvector matrix accepted by the
+                             modal backend; less well-conditioned systems fall back to 'block'
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown simulation backend: {backend}")
+        self.A = np.asarray(A, dtype=np.float64)
+        self.B = np.asarray(B, dtype=np.float64).reshape(self.A.shape[0], -1)
+        self.C = None if C is None else np.asarray(C, dtype=np.float64).reshape(-1, self.A.shape[0])
+        self.D = None if D is None else np.asarray(D, dtype=np.float64).reshape(-1, self.B.shape[1])
+        self.backend = backend
+        self.block_size = block_size
+        self.chunk_size = max(block_size, chunk_size - chunk_size % block_size)
+        self.max_modal_condition = max_modal_condition
+        self.powers = None
+        self.impulse = None
+        self.modal = None
+        if backend == 'modal':
+            self.prepare_modal_operators()
+
+    @classmethod
+    def for_system(cls, system, backend='block'):
+        """
+        Return a simulator for a system object with A, B, C, D attributes (e.g. control.ss)
+        The simulator is cached on the system object, so the block powers or the modal
+        decomposition are computed once per system and reused by every later simulation
+        """
+        cache = getattr(system, 'simulator_cache', None)
+        if cache is None:
+            cache = {}
+            try:
+                system.simulator_cache = cache
+            except AttributeError:
+                pass  # Objects that do not accept attributes are simulated without caching
+
+        simulator = cache.get(backend)
+        if simulator is None or not np.array_equal(simulator.A, system.A):
+            simulator = cls(system.A, system.B, system.C, system.D, backend=backend)
+            cache[backend] = simulator
+        return simulator
+
+    def prepare_block_operators(self):
+        """
+        Precompute A^k (k = 0 ... K) and the impulse response A^k B (k = 0 ... K-1) for the block backend,
+        plus their projections C A^k and C A^k B used when only the output is needed
+        """
+        K = self.block_size
+        n, r = self.B.shape
+        powers = np.empty((K + 1, n, n))
+        powers[0] = np.eye(n)
+        for k in range(1, K + 1):
+            powers[k] = powers[k - 1] @ self.A
+        self.powers = powers
+        self.impulse = (powers[:K] @ self.B).transpose(1, 0, 2).reshape(n, K * r)  # [B, AB, ..., A^(K-1) B]
+        if self.C is not None:
+            m = self.C.shape[0]
+            self.output_powers = (self.C @ powers[:K]).reshape(K * m, n)
+            self.output_impulse = self.C @ self.impulse
+
+    def simulate_chunk_loop(self, U, state):
+        """
+        Step one sample at a time (reference backend)
+        """
+        X = np.empty((len(U), self.A.shape[0]))
+        for t in range(len(U)):
+            X[t] = state
+            state = self.A @ state + self.B @ U[t]
+        return X, state
+
+    def simulate_chunk_block(self, U, state, output_only=False):
+        """
+        Advance a chunk of samples with block products:
+        1. the forced response of every block from a zero state (one matrix product),
+        2. the block boundary states (one small product per block),
+        3. the free response of every block from its boundary state (one matrix product)
+        With output_only, steps 1 and 3 are projected through C, which makes them O(n) per sample
+        Returns the states (or C times the states) and the state after the last sample
+        """
+        if self.powers is None:
+            self.prepare_block_operators()
+        K = self.block_size
+        n, r = self.B.shape
+        L = len(U)
+        num_blocks = -(-L // K)
+
+        # Zero-pad to whole blocks; the padding only affects states after the chunk
+        U_padded = np.zeros((num_blocks * K, r))
+        U_padded[:L] = U
+        U_blocks = U_padded.reshape(num_blocks, K, r)
+
+        # Lower-triangular Toeplitz arrangement: row k of a block holds u[k-1], u[k-2], ..., u[0], 0, ...
+        U_history = np.concatenate((np.zeros((num_blocks, K, r)), U_blocks), axis=1)
+        windows = np.lib.stride_tricks.sliding_window_view(U_history, K, axis=1)[:, :K + 1]
+        toeplitz = windows[..., ::-1].transpose(0, 1, 3, 2).reshape(num_blocks, K + 1, K * r)
+
+        forced_end = toeplitz[:, K] @ self.impulse.T
+        if output_only:
+            forced = toeplitz[:, :K] @ self.output_impulse.T
+            free_operator = self.output_powers
+        else:
+            forced = toeplitz[:, :K] @ self.impulse.T
+            free_operator = self.powers[:K].reshape(K * n, n)
+
+        # Propagate the state across block boundaries
+        boundary = np.empty((num_blocks, n))
+        for b in range(num_blocks):
+            boundary[b] = state
+            state = self.powers[K] @ state + forced_end[b]
+
+        width = forced.shape[2]
+        free = (free_operator @ boundary.T).reshape(K, width, num_blocks)
+        Z = (free.transpose(2, 0, 1) + forced).reshape(num_blocks * K, width)[:L]
+
+        # State after the last real sample (the loop above also ran through the zero padding)
+        j = L - (num_blocks - 1) * K
+        final_state = self.powers[j] @ boundary[-1] + toeplitz[-1, j] @ self.impulse.T
+        return Z, final_state
+
+    def prepare_modal_operators(self):
+        """
+        Diagonalize A = V diag(lambda) V^-1, so each modal coordinate z = V^-1 x follows the first-order
+        recursion z_i[t+1] = lambda_i z_i[t] + (V^-1 B)_i u[t]
+        Of every complex-conjugate pair only the mode with positive imaginary part is simulated; its
+        partner is the complex conjugate, so the pair contributes 2 Re(v_i z_i) to x (a real 2x2 block)
+        Falls back to the block backend if A is not safely diagonalizable
+        """
+        eigenvalues, V = EigenDecompositionCache.shared().eigenvectors(self.A)
+        condition = np.linalg.cond(V)
+        if not np.isfinite(condition) or condition > self.max_modal_condition:
+            print(f"Eigenvector matrix is ill-conditioned (cond = {condition:.2e}); using the block backend instead of modal.")
+            self.backend = 'block'
+            return
+
+        # Keep real modes and the upper half-plane member of each conjugate pair
+        tolerance = 1e-12 * max(1.0, np.max(np.abs(eigenvalues)))
+        is_real = np.abs(eigenvalues.imag) <= tolerance
+        keep = is_real | (eigenvalues.imag > 0)
+        weights = np.where(is_real[keep], 1.0, 2.0)
+
+        V_inverse = np.linalg.inv(V)[keep]
+        self.modal = {
+            'eigenvalues': eigenvalues[keep],
+            'input': V_inverse @ self.B,     # (V^-1 B) for the kept modes
+            'inverse': V_inverse,            # x -> z
+            'states': V[:, keep] * weights   # z -> x = Re(V z)
+        }
+        if self.C is not None:
+            self.modal['output'] = self.C @ self.modal['states']  # z -> C x = Re(C V z)
+
+    def simulate_chunk_modal(self, U, state, output_only=False):
+        """
+        Advance a chunk of samples as a bank of independent first-order IIR filters (one lfilter call
+        per mode, O(n) work per sample in total) and map the modal coordinates back to x or C x
+        Returns the states (or C times the states) and the state after the last sample
+        """
+        modal = self.modal
+        eigenvalues = modal['eigenvalues']
+        z0 = modal['inverse'] @ state
+        drive = modal['input'] @ U.T  # (modes, L), one contiguous row per filter
+
+        Z = np.empty(drive.shape, dtype=complex)
+        z_end = np.empty(len(eigenvalues), dtype=complex)
+        for i, eigenvalue in enumerate(eigenvalues):
+            # z[t] = lambda z[t-1] + drive[t-1] with z[0] = z0 as the filter's initial condition
+            Z[i], final = scipy.signal.lfilter([0.0, 1.0], [1.0, -eigenvalue], drive[i], zi=z0[i:i + 1])
+            z_end[i] = final[0]
+
+        operator = modal['output'] if output_only else modal['states']
+        return (operator @ Z).real.T, (modal['states'] @ z_end).real
+
+    def simulate_chunk_batch(self, U, state):
+        """
+        Step k single-input signals at once with the matrix recursion X[t+1] = A X[t] + B U[t]
+        U: Array of shape (L, k), state: Array of shape (n, k)
+        """
+        X = np.empty((len(U), self.A.shape[0], U.shape[1]))
+        for t in range(len(U)):
+            X[t] = state
+            state = self.A @ state + self.B @ U[t:t + 1]
+        return X, state
+
+    def final_state_batch(self, U, state=None):
+        """
+        Return only the state after the inputs U (shape (L, k)) of a single-input system, starting from
+        state (n x k, zero by default). Each block of K samples is summed with the impulse response
+        [B, AB, ..., A^(K-1) B], so this costs O(n k) per sample plus one A^K product per block,
+        much less than simulating the intermediate states
+        """
+        if self.powers is None:
+            self.prepare_block_operators()
+        K = self.block_size
+        n = self.A.shape[0]
+        L, k = U.shape
+        state = np.zeros((n, k)) if state is None else state
+        num_full = L // K
+
+        # Contribution of every full block to the state at its end, in one product
+        reversed_blocks = U[:num_full * K].reshape(num_full, K, k)[:, ::-1]
+        forced_end = self.impulse @ reversed_blocks
+        for b in range(num_full):
+            state = self.powers[K] @ state + forced_end[b]
+
+        j = L - num_full * K
+        if j > 0:
+            state = self.powers[j] @ state + self.impulse[:, :j] @ U[num_full * K:][::-1]
+        return state
+
+    def simulate_states(self, input_signal, initial_state=None, dtype=np.float64):
+        """
+        Return the state sequence X with X[t] = x[t] for t = 0 ... N-1 (x[0] = initial_state, zero by default)
+        input_signal: Array of shape (N,) for a single input or (N, r)
+        dtype: Precision of the returned array (the recursion itself runs in float64)
+        """
+        U = np.asarray(input_signal, dtype=np.float64).reshape(len(input_signal), -1)
+        n = self.A.shape[0]
+        state = np.zeros(n) if initial_state is None else np.asarray(initial_state, dtype=np.float64)
+
+        X = np.empty((len(U), n), dtype=dtype)
+        for start in range(0, len(U), self.chunk_size):
+            X[start:start + self.chunk_size], state = self.simulate_states_chunk(U[start:start + self.chunk_size], state)
+        return X
+
+    def simulate_states_chunk(self, U, state):
+        """
+        Advance one chunk of inputs U (shape (L, r)) from the given state with the selected backend
+        Returns the states of the chunk and the state after its last sample, so a long signal can be
+        simulated piece by piece by passing the returned state to the next call
+        """
+        simulate_chunk = {
+            'block': self.simulate_chunk_block,
+            'modal': self.simulate_chunk_modal,
+            'loop': self.simulate_chunk_loop
+        }[self.backend]
+        return simulate_chunk(U, state)
+
+    def batch_chunk_size(self, k):
+        """
+        Number of samples per chunk for k simultaneous signals, so that the temporary memory of a
+        batched chunk stays close to that of a single-signal chunk
+        """
+        return max(self.block_size, (self.chunk_size // k) // self.block_size * self.block_size)
+
+    def simulate_output(self, input_signal, initial_state=None, dtype=np.float64):
+        """
+        Return the output sequence y[t] = C x[t] + D u[t] (shape (N,) for a single output, else (N, m))
+        """
+        U = np.asarray(input_signal, dtype=np.float64).reshape(len(input_signal), -1)
+        Y = np.empty((len(U), self.C.shape[0]), dtype=dtype)
+        n = self.A.shape[0]
+        state = np.zeros(n) if initial_state is None else np.asarray(initial_state, dtype=np.float64)
+
+        # Only one chunk is held at a time
+        for start in range(0, len(U), self.chunk_size):
+            U_chunk = U[start:start + self.chunk_size]
+            if self.backend == 'block':
+                CX_chunk, state = self.simulate_chunk_block(U_chunk, state, output_only=True)
+            elif self.backend == 'modal':
+                CX_chunk, state = self.simulate_chunk_modal(U_chunk, state, output_only=True)
+            else:
+                X_chunk, state = self.simulate_chunk_loop(U_chunk, state)
+                CX_chunk = X_chunk @ self.C.T
+            Y[start:start + self.chunk_size] = CX_chunk + U_chunk @ self.D.T
+        return Y[:, 0] if Y.shape[1] == 1 else Y
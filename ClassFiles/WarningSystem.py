@@ -1,20 +1,19 @@
-import numpy as np
-
 class WarningSystem:
     def __init__(self, slider_controller):
         self.slider_controller = slider_controller
 
-    def check_stability(self):
-        """ Check the eigenvalues of (A - gain * B * C / (1 + gain * D)) and provide feedback. """
+    def check_stability(self, analysis=None):
+        """ Check the eigenvalues of (A - gain * B * C / (1 + gain * D)) and provide feedback.
+        Returns True if a warning was given. """
         
-        # Calculate eigenvalues of the state-space model
-        eigenvalues = self.slider_controller.state_space_model.calculate_eigenvalues()
-
-        # Check for unstable eigenvalues (real part > 0)
-        unstable_eigenvalues = np.any(np.real(eigenvalues) > 0)
+        # Analyze the closed loop of the current gain unless the analysis is given
+        if analysis is None:
+            analysis = self.slider_controller.state_space_model.analyze_closed_loop()
 
-        # Display a warning if any unstable eigenvalues are found
-        if unstable_eigenvalues:
-            print("Warning: The system has unstable eigenvalues!")
+        # Display a warning if the analysis found unstable eigenvalues (spectral radius of the discrete A_cl >= 1)
+        if not analysis.stable:
+            print(f"Warning: The system has unstable eigenvalues! (spectral radius {analysis.spectral_radius:.6f}, "
+                  f"dominant mode at {analysis.dominant_frequency:.1f} Hz)")
         else:
             print("System is stable.")
+        return not analysis.stable
@@ -0,0 +1,48 @@
+import sys
+import time
+import numpy as np
+from ClassFiles.StateSpaceSimulator import StateSpaceSimulator
+
+def random_stable_system(n, spectral_radius=0.99, seed=0):
+    """
+    Generate a random single-input single-output system whose poles lie inside the given radius
+    """
+    rng = np.random.default_rng(seed)
+    A = rng.standard_normal((n, n))
+    A *= spectral_radius / np.max(np.abs(np.linalg.eigvals(A)))
+    B = rng.standard_normal((n, 1))
+    C = rng.standard_normal((1, n))
+    D = rng.standard_normal((1, 1))
+    return A, B, C, D
+
+def main():
+    # Usage: python benchmark_simulation.py [num_samples] [system_order]
+    num_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 882000  # 20 s at 44.1 kHz
+    system_order = int(sys.argv[2]) if len(sys.argv) > 2 else 149
+
+    A, B, C, D = random_stable_system(system_order)
+    input_signal = np.random.default_rng(1).standard_normal(num_samples)
+    print(f"Simulating {num_samples} samples of an order {system_order} system")
+
+    results = {}
+    for backend in StateSpaceSimulator.BACKENDS:
+        simulator = StateSpaceSimulator(A, B, C, D, backend=backend)
+
+        start = time.perf_counter()
+        states = simulator.simulate_states(input_signal)
+        time_states = time.perf_counter() - start
+
+        start = time.perf_counter()
+        output = simulator.simulate_output(input_signal)
+        time_output = time.perf_counter() - start
+
+        results[backend] = (states, output)
+        print(f"{backend:>6}: states {time_states:8.3f} s, output {time_output:8.3f} s")
+
+    for backend in StateSpaceSimulator.BACKENDS[:-1]:
+        states_error = np.max(np.abs(results[backend][0] - results['loop'][0]))
+        output_error = np.max(np.abs(results[backend][1] - results['loop'][1]))
+        print(f"Max difference {backend} vs loop: states {states_error:.3e}, output {output_error:.3e}")
+
+if __name__ == "__main__":
+    main()
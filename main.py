@@ -34,6 +34,9 @@ def main():
     SRIM_plant_system = simulation.identify_system_SRIM(input_data, output_data)
     print("System identification completed.")
 
+    # Optionally compare candidate orders from a single decomposition
+    # sweep_results = simulation.identify_system_SRIM_sweep(input_data, output_data, range(10, 201))
+
     # Set up the State Feedback Controller
     print("Setting up State Feedback Controller...")
     SFC = StateFeedbackController(